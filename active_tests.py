@@ -0,0 +1,99 @@
+"""
+Server-side state of tests in progress.
+
+The questions, running score and answers of a mock or real test live in the
+test_session table, keyed by an opaque random id; the cookie only holds that
+id. Every submitted answer is written to the row straight away, so
+test_complete reads them from the database. Abandoned tests expire after
+TEST_TTL without an answer and are purged when the next test starts.
+"""
+import json
+import secrets
+from datetime import datetime, timedelta
+
+from models import db, TestSession
+
+TEST_TTL = timedelta(hours=2)
+
+def purge_expired_tests(now=None):
+    """Delete every test session past its expiry time (runs in the caller's transaction)"""
+    now = now or datetime.utcnow()
+    return db.session.execute(
+        db.delete(TestSession).where(TestSession.expires_at < now)
+    ).rowcount
+
+def start_test(user_id, test_type, questions, is_mock, direction=None):
+    """
+    Create a test session for user_id and return it. Earlier unfinished tests
+    of the user are dropped. Runs in the caller's transaction.
+    """
+    now = datetime.utcnow()
+    purge_expired_tests(now)
+    db.session.execute(db.delete(TestSession).where(TestSession.user_id == user_id))
+    test = TestSession(
+        id=secrets.token_urlsafe(16),
+        user_id=user_id,
+        test_type=test_type,
+        direction=direction,
+        is_mock=is_mock,
+        questions=json.dumps(list(questions)),
+        current_question=0,
+        score=0,
+        answers='[]',
+        expires_at=now + TEST_TTL
+    )
+    db.session.add(test)
+    return test
+
+def load_test(test_id, user_id):
+    """Return the unexpired test session test_id of user_id, or None"""
+    if not test_id:
+        return None
+    return db.session.execute(
+        db.select(TestSession).filter(
+            TestSession.id == test_id,
+            TestSession.user_id == user_id,
+            TestSession.expires_at >= datetime.utcnow()
+        )
+    ).scalar_one_or_none()
+
+def question_ids(test):
+    return json.loads(test.questions)
+
+def test_answers(test):
+    return json.loads(test.answers)
+
+def current_question_id(test):
+    """Id of the word/verb to ask next, or None when every question was answered"""
+    questions = question_ids(test)
+    if test.current_question >= len(questions):
+        return None
+    return questions[test.current_question]
+
+def has_more_questions(test):
+    return test.current_question < len(question_ids(test))
+
+def record_test_answers(test, answers, points=0, questions=1):
+    """
+    Store the answers to the current question (or to the next `questions`
+    questions, for a batch submission) and move past them.
+    The row is only updated if nobody answered this question in the meantime
+    (e.g. a double submit); returns False in that case. Runs in the caller's
+    transaction.
+    """
+    result = db.session.execute(
+        db.update(TestSession)
+        .where(TestSession.id == test.id,
+               TestSession.current_question == test.current_question)
+        .values(
+            answers=json.dumps(test_answers(test) + list(answers)),
+            current_question=TestSession.current_question + questions,
+            score=TestSession.score + points,
+            expires_at=datetime.utcnow() + TEST_TTL
+        )
+    )
+    return result.rowcount == 1
+
+def finish_test(test):
+    """Delete a completed test session (runs in the caller's transaction)"""
+    db.session.delete(test)
@@ -0,0 +1,184 @@
+"""
+Learning time tracking.
+
+Requests only touch an in-memory activity window per user (start, last seen).
+A window is closed after IDLE_TIMEOUT seconds without a request, at logout or
+at shutdown; closed windows are written as finished ActivityLog rows, and the
+user's total_time_minutes is increased, in one batch every FLUSH_INTERVAL
+seconds. Recording that a user is still there therefore never writes to the
+database.
+
+Windows are kept per process, so the app should run a single worker process
+(as app.run does).
+"""
+import atexit
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import bindparam, func
+
+from models import db, UserProgress, ActivityLog
+
+IDLE_TIMEOUT = 300   # 5 minutes of inactivity close a window
+FLUSH_INTERVAL = 60  # Seconds between background flushes
+
+def duration_minutes(start, end):
+    return int((end - start).total_seconds() / 60)
+
+class ActivityTracker:
+    """
+    Activity windows of the users active in this process.
+    Open windows are {user_id: [start, last_seen]}; closed windows wait in a
+    list of (user_id, start, end) until the next flush().
+    """
+
+    def __init__(self, idle_timeout=IDLE_TIMEOUT, flush_interval=FLUSH_INTERVAL):
+        self.idle_timeout = idle_timeout
+        self.flush_interval = flush_interval
+        self.app = None
+        self._lock = threading.Lock()
+        self._open = {}
+        self._closed = []
+        self._thread = None
+
+    def init_app(self, app):
+        """Flush through app's database; pending windows are also written at interpreter exit"""
+        self.app = app
+        atexit.register(self.shutdown)
+
+    def _ensure_started(self):
+        # The flush thread starts with the first tracked request, so scripts that
+        # only import the app do not get one
+        if self._thread is None and self.app is not None:
+            self._thread = threading.Thread(target=self._run, name='activity-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception:
+                # Windows stay queued and are retried on the next round
+                self.app.logger.exception("Activity flush failed")
+
+    def _close(self, user_id, end):
+        window = self._open.pop(user_id, None)
+        if window is not None:
+            self._closed.append((user_id, window[0], end))
+
+    def _expire_idle(self, now):
+        for user_id, (start, last_seen) in list(self._open.items()):
+            if (now - last_seen).total_seconds() > self.idle_timeout:
+                self._close(user_id, last_seen)
+
+    def touch(self, user_id, now=None):
+        """Record a request of user_id (called for every non-static request)"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            window = self._open.get(user_id)
+            if window is None or (now - window[1]).total_seconds() > self.idle_timeout:
+                # New window; an idle one ends at its last request
+                if window is not None:
+                    self._close(user_id, window[1])
+                self._open[user_id] = [now, now]
+            else:
+                window[1] = now
+        self._ensure_started()
+
+    def start(self, user_id, now=None):
+        """Start a fresh window (login)"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            window = self._open.get(user_id)
+            if window is not None:
+                self._close(user_id, window[1])
+            self._open[user_id] = [now, now]
+        self._ensure_started()
+
+    def end(self, user_id, now=None):
+        """Close the user's window now (logout)"""
+        with self._lock:
+            self._close(user_id, now or datetime.utcnow())
+
+    def reset(self, user_id, now=None):
+        """Drop everything not yet written for user_id and restart the window (progress was cleared)"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            self._closed = [window for window in self._closed if window[0] != user_id]
+            if user_id in self._open:
+                self._open[user_id] = [now, now]
+
+    def unflushed(self, user_id, now=None):
+        """
+        Activity of user_id that is not in the database yet, as a list of
+        (start, end) - closed windows plus the open one, which ends now.
+        """
+        now = now or datetime.utcnow()
+        with self._lock:
+            windows = [(start, end) for uid, start, end in self._closed if uid == user_id]
+            window = self._open.get(user_id)
+            if window is not None:
+                start, last_seen = window
+                idle = (now - last_seen).total_seconds() > self.idle_timeout
+                windows.append((start, last_seen if idle else now))
+        return windows
+
+    def flush(self, now=None):
+        """
+        Write closed windows as ActivityLog rows and add their minutes to
+        total_time_minutes, in one transaction. Needs an app context.
+        Returns the number of windows written.
+        """
+        now = now or datetime.utcnow()
+        with self._lock:
+            self._expire_idle(now)
+            closed, self._closed = self._closed, []
+        if not closed:
+            return 0
+
+        logs = []
+        minutes = {}
+        for user_id, start, end in closed:
+            duration = duration_minutes(start, end)
+            logs.append({'user_id': user_id, 'start_time': start, 'end_time': end,
+                         'duration_minutes': duration})
+            minutes[user_id] = minutes.get(user_id, 0) + duration
+
+        increments = [{'b_user_id': user_id, 'b_minutes': total}
+                      for user_id, total in minutes.items() if total]
+        progress = UserProgress.__table__
+        try:
+            db.session.execute(db.insert(ActivityLog), logs)
+            if increments:
+                db.session.execute(
+                    db.update(progress)
+                    .where(progress.c.user_id == bindparam('b_user_id'))
+                    .values(total_time_minutes=func.coalesce(progress.c.total_time_minutes, 0)
+                            + bindparam('b_minutes')),
+                    increments
+                )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            with self._lock:
+                self._closed[:0] = closed
+            raise
+        return len(closed)
+
+    def shutdown(self):
+        """Close every open window at its last request and write everything out"""
+        if self.app is None:
+            return
+        with self._lock:
+            for user_id, (start, last_seen) in list(self._open.items()):
+                self._close(user_id, last_seen)
+        try:
+            with self.app.app_context():
+                self.flush()
+        except Exception:
+            self.app.logger.exception("Activity flush at shutdown failed")
+
+activity_tracker = ActivityTracker()
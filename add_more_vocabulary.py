@@ -1,5 +1,6 @@
 from app import app, db
 from models import Word, Verb
+from catalog import bump_catalog_generation
 
 def add_vocabulary():
     with app.app_context():
@@ -342,6 +343,8 @@ def add_vocabulary():
                 db.session.add(word)
                 added_nouns += 1
 
+        if added_nouns:
+            bump_catalog_generation()
         db.session.commit()
         print(f"✓ Added {added_nouns} new nouns")
 
@@ -364,6 +367,8 @@ def add_vocabulary():
                 db.session.add(verb)
                 added_verbs += 1
 
+        if added_verbs:
+            bump_catalog_generation()
         db.session.commit()
         print(f"✓ Added {added_verbs} new verbs")
 
@@ -0,0 +1,250 @@
+"""
+Append-only answer log.
+
+Every practice answer, card view and mock/real test answer is stored as an
+AnswerEvent row (user, word or verb, mode, correctness, time), and the
+WordProgress/VerbProgress rows are a fold of that log:
+
+- with PROGRESS_WRITE_MODE = 'events' a request only appends its events
+  (applied = False) and compact_events() folds them into the progress rows in
+  batches, so answering never updates a shared progress row
+- in the other modes the progress rows are updated right away and the events
+  are appended already applied
+- rebuild_progress() recomputes progress from the whole log, e.g. after the
+  scoring formula in progress.py changed. It refuses to run while progress
+  rows have fewer events than answers behind them (recorded before the log
+  existed, or pruned), since rebuilding would drop that progress.
+- prune_events() deletes applied events older than ANSWER_EVENT_RETENTION_DAYS.
+  Pruning is off by default (None keeps the whole log), because progress
+  whose events were pruned can no longer be rebuilt
+
+compact_events() and prune_events() write on a connection of their own and
+retry a batch with db_retry's backoff when SQLite reports the database busy.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+
+from models import db, AnswerEvent
+from db_retry import RETRY_DEADLINE, backoff_delay, is_busy_error
+from progress import _PROGRESS, ProgressDelta, apply_progress_deltas, reconcile_learned_counts
+
+EVENT_MODES = ('practice', 'mock', 'real')
+COMPACTION_BATCH = 500  # Events folded (or pruned) per transaction
+ANSWER_EVENT_RETENTION_DAYS = None  # Applied events older than this many days are pruned; None keeps them
+
+_EVENT_COLUMNS = (AnswerEvent.id, AnswerEvent.user_id, AnswerEvent.word_id, AnswerEvent.verb_id,
+                  AnswerEvent.is_correct, AnswerEvent.created_at)
+
+# One compaction at a time per process; other processes are caught by the claim in compact_events()
+_compaction_lock = threading.Lock()
+
+def event_row(user_id, kind, item_id, mode, is_correct=None, when=None):
+    """Parameters of one AnswerEvent for append_events(); is_correct None is a card view"""
+    return {
+        'user_id': user_id,
+        'word_id': item_id if kind == 'word' else None,
+        'verb_id': item_id if kind == 'verb' else None,
+        'mode': mode,
+        'is_correct': is_correct,
+        'created_at': when or datetime.utcnow(),
+    }
+
+def append_events(rows, applied=False, executor=None):
+    """Insert event rows with one executemany INSERT (in the caller's transaction by default)"""
+    if not rows:
+        return
+    executor = executor if executor is not None else db.session
+    executor.execute(db.insert(AnswerEvent), [dict(row, applied=applied) for row in rows])
+
+def fold_events(events, deltas=None):
+    """
+    Fold event rows (with user_id, word_id, verb_id, is_correct, created_at),
+    in log order, into {(user_id, kind, item_id): ProgressDelta}
+    """
+    deltas = {} if deltas is None else deltas
+    for event in events:
+        if event.word_id is not None:
+            key = (event.user_id, 'word', event.word_id)
+        else:
+            key = (event.user_id, 'verb', event.verb_id)
+        delta = deltas.get(key)
+        if delta is None:
+            delta = deltas[key] = ProgressDelta()
+        if event.is_correct is None:
+            delta.add_view(event.created_at)
+        else:
+            delta.add(event.is_correct, event.created_at)
+    return deltas
+
+def pending_priorities(user_id, kind, item_ids=None, executor=None):
+    """
+    {item_id: priority} of the user's items that have events not folded yet:
+    the stored priority_score with those events applied on top
+    """
+    executor = executor if executor is not None else db.session
+    model, item_fk = _PROGRESS[kind]
+    event_fk = getattr(AnswerEvent, item_fk)
+    events = (
+        db.select(*_EVENT_COLUMNS)
+        .where(AnswerEvent.user_id == user_id, AnswerEvent.applied == False, event_fk.isnot(None))
+        .order_by(AnswerEvent.id)
+    )
+    if item_ids is not None:
+        events = events.where(event_fk.in_(list(item_ids)))
+    deltas = fold_events(executor.execute(events))
+    if not deltas:
+        return {}
+
+    fk_column = getattr(model, item_fk)
+    stored = dict(executor.execute(
+        db.select(fk_column, model.priority_score)
+        .where(model.user_id == user_id, fk_column.in_([item_id for _, _, item_id in deltas]))
+    ).all())
+    return {item_id: delta.apply(stored.get(item_id)) for (_, _, item_id), delta in deltas.items()}
+
+def _backoff_after_busy(error, retry, started):
+    # Sleep and return True if error is SQLITE_BUSY and the batch may still be retried
+    if not is_busy_error(error):
+        return False
+    delay = backoff_delay(retry)
+    if time.monotonic() - started + delay > RETRY_DEADLINE:
+        return False
+    time.sleep(delay)
+    return True
+
+def compact_events(user_ids=None, batch_size=COMPACTION_BATCH):
+    """
+    Fold pending events (of user_ids, or of everyone) into the progress rows,
+    oldest first, batch_size events per transaction. Runs on a connection of
+    its own and marks each batch applied in the same transaction as its
+    progress update. Needs an app context; returns the number of events folded.
+    """
+    events = (
+        db.select(*_EVENT_COLUMNS)
+        .where(AnswerEvent.applied == False)
+        .order_by(AnswerEvent.id)
+        .limit(batch_size)
+    )
+    if user_ids is not None:
+        events = events.where(AnswerEvent.user_id.in_(list(user_ids)))
+
+    folded = 0
+    retry, started = 0, time.monotonic()
+    with _compaction_lock, db.engine.connect() as connection:
+        while True:
+            try:
+                batch = connection.execute(events).all()
+                if not batch:
+                    break
+                ids = [event.id for event in batch]
+                # Claiming the batch takes the write lock; if another process folded
+                # some of these events in the meantime, start over from a fresh read
+                claimed = connection.execute(
+                    db.update(AnswerEvent)
+                    .where(AnswerEvent.id.in_(ids), AnswerEvent.applied == False)
+                    .values(applied=True)
+                ).rowcount
+                if claimed != len(ids):
+                    connection.rollback()
+                    continue
+                apply_progress_deltas(fold_events(batch), connection)
+                connection.commit()
+            except OperationalError as e:
+                connection.rollback()
+                if not _backoff_after_busy(e, retry, started):
+                    raise
+                retry += 1
+                continue
+            folded += len(batch)
+            retry, started = 0, time.monotonic()
+    return folded
+
+def prune_events(max_age_days, batch_size=COMPACTION_BATCH):
+    """
+    Delete applied events older than max_age_days, batch_size per
+    transaction. Pending events are never pruned. Runs on a connection of its
+    own; needs an app context and returns the number of events deleted.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=max_age_days)
+    old_events = (
+        db.select(AnswerEvent.id)
+        .where(AnswerEvent.applied == True, AnswerEvent.created_at < cutoff)
+        .limit(batch_size)
+    )
+    delete = db.delete(AnswerEvent).where(AnswerEvent.id.in_(old_events.scalar_subquery()))
+
+    pruned = 0
+    retry, started = 0, time.monotonic()
+    with db.engine.connect() as connection:
+        while True:
+            try:
+                deleted = connection.execute(delete).rowcount
+                connection.commit()
+            except OperationalError as e:
+                connection.rollback()
+                if not _backoff_after_busy(e, retry, started):
+                    raise
+                retry += 1
+                continue
+            if not deleted:
+                break
+            pruned += deleted
+            retry, started = 0, time.monotonic()
+    return pruned
+
+def uncovered_progress(user_ids=None):
+    """
+    Number of WordProgress/VerbProgress rows (of user_ids, or of everyone)
+    that were seen more often than the log has events for them, i.e. whose
+    progress rebuild_progress() would lose
+    """
+    return sum(db.session.execute(uncovered_progress_statement(kind, user_ids)).scalar()
+               for kind in _PROGRESS)
+
+def uncovered_progress_statement(kind, user_ids=None):
+    """SELECT count(*) of the kind's progress rows with fewer events than times_seen"""
+    model, item_fk = _PROGRESS[kind]
+    events = (
+        db.select(func.count())
+        .where(AnswerEvent.user_id == model.user_id,
+               getattr(AnswerEvent, item_fk) == getattr(model, item_fk))
+        .scalar_subquery()
+    )
+    rows = db.select(func.count()).select_from(model).where(model.times_seen > events)
+    if user_ids is not None:
+        rows = rows.where(model.user_id.in_(list(user_ids)))
+    return rows
+
+def rebuild_progress(user_ids=None):
+    """
+    Recompute WordProgress/VerbProgress of user_ids (None = every user) from
+    their whole event log and mark every event applied. Raises ValueError if
+    some progress is not covered by the log (see uncovered_progress()). Runs in
+    the caller's transaction; returns the number of events folded.
+    """
+    uncovered = uncovered_progress(user_ids)
+    if uncovered:
+        raise ValueError(f"{uncovered} progress rows have answers that are not in the answer log")
+
+    for model, _ in _PROGRESS.values():
+        delete = db.delete(model)
+        if user_ids is not None:
+            delete = delete.where(model.user_id.in_(list(user_ids)))
+        db.session.execute(delete.execution_options(synchronize_session=False))
+
+    events = db.select(*_EVENT_COLUMNS).order_by(AnswerEvent.id)
+    mark_applied = db.update(AnswerEvent).values(applied=True)
+    if user_ids is not None:
+        events = events.where(AnswerEvent.user_id.in_(list(user_ids)))
+        mark_applied = mark_applied.where(AnswerEvent.user_id.in_(list(user_ids)))
+
+    deltas = fold_events(db.session.execute(events.execution_options(yield_per=COMPACTION_BATCH)))
+    db.session.execute(mark_applied.execution_options(synchronize_session=False))
+    apply_progress_deltas(deltas)
+    # The learned counters were incremented on top of the old values
+    reconcile_learned_counts()
+    return sum(delta.seen for delta in deltas.values())
@@ -1,5 +1,18 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash, abort
 from models import db, User, Word, Verb, UserProgress, WordProgress, VerbProgress, TestResult, TestAnswer, ActivityLog
+from catalog import catalog, bump_catalog_generation
+from catalog_bundle import catalog_bundles, catalog_changes
+from grading import CONJUGATIONS, grade_word, grade_verb
+from db_profile import SQLITE_PRAGMAS, SQLITE_ENGINE_OPTIONS, listen_for_connections
+from db_retry import retry_on_busy, retry_stats
+from selection import priority_indexes, pick_card_sql
+from progress_buffer import progress_buffer
+from synonyms import synonym_index
+from activity import activity_tracker, duration_minutes
+from retention import test_retention, purge_user_history
+from grade_cache import overall_grades
+from active_tests import (start_test, load_test, question_ids, test_answers, current_question_id,
+                           has_more_questions, record_test_answers, finish_test)
 from datetime import datetime, timedelta
 from functools import wraps
 import random
@@ -10,8 +23,38 @@ app = Flask(__name__)
 app.config['SECRET_KEY'] = 'learn-german-secret-key'
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///learnGerman.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# SQLite profile: pool sizing and the PRAGMAs run on every new connection (see db_profile.py)
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(SQLITE_ENGINE_OPTIONS)
+app.config['SQLITE_PRAGMAS'] = dict(SQLITE_PRAGMAS)
+# How learn_vocabulary/learn_verbs pick the next card:
+# 'memory' uses the per-user priority index, 'sql' lets SQLite pick and loads only that row
+app.config['CARD_SELECTION_MODE'] = 'memory'
+# Near-miss grading in practice and mock tests: answers within this many typos (at most one
+# per 4 letters) count as correct, and typing another vocabulary word is reported. 0 = exact only
+app.config['GRADING_TYPO_DISTANCE'] = 0
+# Practice deck API: most cards per /practice-deck request and answers per /practice-answers request
+app.config['PRACTICE_DECK_MAX_CARDS'] = 50
+app.config['PRACTICE_MAX_ANSWERS'] = 200
+# Tests kept per user, test type and mock/real; older ones are deleted.
+# 'inline' trims the history when a test is finished, 'background' does it from a worker thread
+app.config['TEST_RETENTION_COUNT'] = 10
+app.config['TEST_RETENTION_MODE'] = 'inline'
+# How practice answers reach the database: 'immediate' writes each one in its request,
+# 'buffered' merges them in memory and writes them in batches (see progress_buffer.py)
+# 'events' only appends to the answer log and folds it into the progress rows in the background
+app.config['PROGRESS_WRITE_MODE'] = 'immediate'
+app.config['PROGRESS_FLUSH_INTERVAL'] = 0.5      # Seconds between buffered writes / event compactions
+app.config['PROGRESS_FLUSH_MAX_PENDING'] = 200   # Pending items that trigger an early write
+# Applied answer events older than this many days are deleted by compact_events.py. None (the default)
+# keeps the whole log; pruned events can no longer be used by compact_events.py --rebuild
+app.config['ANSWER_EVENT_RETENTION_DAYS'] = None
 
 db.init_app(app)
+with app.app_context():
+    listen_for_connections(db.engine, app.config['SQLITE_PRAGMAS'])
+activity_tracker.init_app(app)
+test_retention.init_app(app)
+progress_buffer.init_app(app)
 
 # Custom Jinja filter for timezone adjustment (UTC to local time, +1 hour for CET/CEST)
 @app.template_filter('localtime')
@@ -21,54 +64,18 @@ def localtime_filter(dt):
         return None
     return dt + timedelta(hours=1)
 
-# Helper function to normalize umlauts for answer comparison
-def normalize_umlauts(text):
-    """Convert umlauts to their ae/oe/ue/ss equivalents for flexible answer matching"""
-    if not text:
-        return text
-    replacements = {
-        'ä': 'ae', 'Ä': 'Ae',
-        'ö': 'oe', 'Ö': 'Oe',
-        'ü': 'ue', 'Ü': 'Ue',
-        'ß': 'ss'
-    }
-    normalized = text
-    for umlaut, replacement in replacements.items():
-        normalized = normalized.replace(umlaut, replacement)
-    return normalized
-
-def weighted_sample_without_replacement(items, weights, k):
-    """
-    Perform weighted sampling without replacement.
-
-    Args:
-        items: List of items to sample from
-        weights: List of weights corresponding to items
-        k: Number of items to select
-
-    Returns:
-        List of selected items (no duplicates)
-    """
-    if not items or k <= 0:
-        return []
+# Helper functions to grade practice and mock test answers (near-miss grading if enabled,
+# dictionary synonyms for German -> English)
+def grade_word_answer(word, answer, direction='en-de'):
+    typo_distance = app.config['GRADING_TYPO_DISTANCE']
+    known_forms = catalog.answer_forms(direction) if typo_distance else None
+    synonyms = synonym_index.lemmas_by_gloss() if direction == 'de-en' else None
+    return grade_word(word, answer, direction, typo_distance, known_forms, synonyms)
 
-    # Convert to lists to allow modification
-    available_items = list(items)
-    available_weights = list(weights)
-    selected = []
-
-    # Sample k items (or all available if k > len(items))
-    for _ in range(min(k, len(available_items))):
-        # Use random.choices to pick one item based on current weights
-        chosen = random.choices(available_items, weights=available_weights, k=1)[0]
-        selected.append(chosen)
-
-        # Remove the chosen item and its weight from the available pool
-        idx = available_items.index(chosen)
-        available_items.pop(idx)
-        available_weights.pop(idx)
-
-    return selected
+def grade_verb_answers(verb, answers):
+    typo_distance = app.config['GRADING_TYPO_DISTANCE']
+    known_forms = catalog.answer_forms('verb') if typo_distance else None
+    return grade_verb(verb, answers, typo_distance, known_forms)
 
 # Helper function to get face and comment based on score
 def get_face_and_comment(percentage):
@@ -184,6 +191,51 @@ def get_overall_grade(user_id):
 
     return letter_grade, avg_percentage, face
 
+# Helper function to list the tests shown on the progress page
+def get_test_history(user_id):
+    """
+    Return (real tests, last 10 mock tests) as lists of {'test', 'mistakes'}.
+    Uses three queries however long the history is; word and verb names come
+    from the catalog.
+    """
+    real_tests = TestResult.query.filter_by(user_id=user_id, is_mock=False).order_by(TestResult.date.desc()).all()
+    mock_tests = TestResult.query.filter_by(user_id=user_id, is_mock=True).order_by(TestResult.date.desc()).limit(10).all()
+
+    # Wrong answers of all the user's tests in one query
+    wrong_answers = {}
+    rows = db.session.execute(
+        db.select(TestAnswer.test_id, TestAnswer.word_id, TestAnswer.verb_id)
+        .join(TestResult, TestAnswer.test_id == TestResult.id)
+        .filter(TestResult.user_id == user_id, TestAnswer.is_correct == False)
+        .order_by(TestAnswer.id)
+    )
+    for test_id, word_id, verb_id in rows:
+        wrong_answers.setdefault(test_id, []).append((word_id, verb_id))
+
+    def with_mistakes(tests):
+        result = []
+        for test in tests:
+            mistakes = []
+            seen_verbs = set()  # Track verbs to avoid duplicates
+            for word_id, verb_id in wrong_answers.get(test.id, []):
+                if word_id:
+                    word = catalog.word(word_id)
+                    if word:
+                        mistakes.append(f"{word.article} {word.german}")
+                elif verb_id:
+                    verb = catalog.verb(verb_id)
+                    if verb and verb.id not in seen_verbs:
+                        mistakes.append(verb.infinitive)
+                        seen_verbs.add(verb.id)
+            result.append({'test': test, 'mistakes': mistakes})
+        return result
+
+    return with_mistakes(real_tests), with_mistakes(mock_tests)
+
+# Helper function to get the test in progress (the cookie only holds its id)
+def get_current_test():
+    return load_test(session.get('test_id'), session['user_id'])
+
 # Helper function to check if user can take a real test today
 def can_take_real_test(user_id, test_type):
     """
@@ -203,82 +255,19 @@ def can_take_real_test(user_id, test_type):
 
     return test_today is None
 
-# Helper function to cycle old tests (keep only last 10)
-def cycle_old_tests(user_id):
-    """
-    Delete tests beyond the last 10 for each test type (mock and real).
-    This keeps the database clean and ensures grade calculation uses recent tests.
-    """
-    # For each test type (vocabulary, verbs) and mock status (True, False)
-    for test_type in ['vocabulary', 'verbs']:
-        for is_mock in [True, False]:
-            # Get all tests for this combination, ordered by date descending
-            tests = TestResult.query.filter_by(
-                user_id=user_id,
-                test_type=test_type,
-                is_mock=is_mock
-            ).order_by(TestResult.date.desc()).all()
-
-            # If more than 10, delete the older ones
-            if len(tests) > 10:
-                tests_to_delete = tests[10:]  # Everything after the first 10
-                for test in tests_to_delete:
-                    # Delete associated test answers first
-                    TestAnswer.query.filter_by(test_id=test.id).delete()
-                    # Delete the test itself
-                    db.session.delete(test)
-
-    db.session.commit()
-
-# Activity tracking helper
-def update_activity():
-    if 'user_id' in session and 'last_activity' in session:
-        last_activity = datetime.fromisoformat(session['last_activity'])
-        now = datetime.utcnow()
-
-        # If more than 5 minutes of inactivity, start new session
-        if (now - last_activity).total_seconds() > 300:  # 5 minutes
-            # End previous activity log
-            if 'activity_log_id' in session:
-                log = ActivityLog.query.get(session['activity_log_id'])
-                if log and not log.end_time:
-                    log.end_time = last_activity
-                    log.duration_minutes = int((log.end_time - log.start_time).total_seconds() / 60)
-
-                    # Update user's total time
-                    progress = UserProgress.query.filter_by(user_id=session['user_id']).first()
-                    if progress:
-                        progress.total_time_minutes += log.duration_minutes
-                    db.session.commit()
-
-            # Start new activity log
-            new_log = ActivityLog(user_id=session['user_id'])
-            db.session.add(new_log)
-            db.session.commit()
-            session['activity_log_id'] = new_log.id
-
-        session['last_activity'] = now.isoformat()
-
-def start_activity_tracking():
-    if 'user_id' in session:
-        log = ActivityLog(user_id=session['user_id'])
-        db.session.add(log)
-        db.session.commit()
-        session['activity_log_id'] = log.id
-        session['last_activity'] = datetime.utcnow().isoformat()
-
-def end_activity_tracking():
-    if 'activity_log_id' in session:
-        log = ActivityLog.query.get(session['activity_log_id'])
-        if log and not log.end_time:
-            log.end_time = datetime.utcnow()
-            log.duration_minutes = int((log.end_time - log.start_time).total_seconds() / 60)
-
-            # Update user's total time
-            progress = UserProgress.query.filter_by(user_id=session['user_id']).first()
-            if progress:
-                progress.total_time_minutes += log.duration_minutes
-            db.session.commit()
+# Helper function to store the answers of a finished test
+def save_test_answers(test_id, answers):
+    """Insert all TestAnswer rows of a test with one executemany"""
+    if not answers:
+        return
+    db.session.execute(db.insert(TestAnswer), [{
+        'test_id': test_id,
+        'word_id': answer.get('word_id'),
+        'verb_id': answer.get('verb_id'),
+        'user_answer': answer['user_answer'],
+        'correct_answer': answer['correct_answer'],
+        'is_correct': answer['is_correct']
+    } for answer in answers])
 
 # Admin decorator
 def admin_required(f):
@@ -298,7 +287,7 @@ def admin_required(f):
 def inject_overall_grade():
     """Make overall grade available to all templates"""
     if 'user_id' in session:
-        letter_grade, percentage, face = get_overall_grade(session['user_id'])
+        letter_grade, percentage, face = overall_grades.get(session['user_id'], get_overall_grade)
         return {
             'overall_grade': letter_grade,
             'overall_percentage': percentage,
@@ -313,7 +302,7 @@ def inject_overall_grade():
 @app.before_request
 def before_request():
     if request.endpoint not in ['login', 'static'] and 'user_id' in session:
-        update_activity()
+        activity_tracker.touch(session['user_id'])
 
 @app.route('/')
 def index():
@@ -331,7 +320,7 @@ def login():
         if user:
             session['user_id'] = user.id
             session['username'] = user.username
-            start_activity_tracking()
+            activity_tracker.start(user.id)
             return redirect(url_for('dashboard'))
         else:
             return render_template('login.html', error='Invalid username or password')
@@ -340,7 +329,9 @@ def login():
 
 @app.route('/logout')
 def logout():
-    end_activity_tracking()
+    if 'user_id' in session:
+        activity_tracker.end(session['user_id'])
+        progress_buffer.flush(session['user_id'])
     session.clear()
     return redirect(url_for('login'))
 
@@ -379,90 +370,37 @@ def real_test_selection():
 def progress():
     if 'user_id' not in session:
         return redirect(url_for('login'))
+    # The statistics below are read from the database
+    progress_buffer.flush(session['user_id'])
     user = User.query.get(session['user_id'])
     if user and user.is_admin:
         return redirect(url_for('admin_dashboard'))
 
     user_progress = UserProgress.query.filter_by(user_id=session['user_id']).first()
 
-    # Calculate total time including current session
-    total_time = user_progress.total_time_minutes if user_progress else 0
+    # Learning time in the database plus activity the tracker has not written yet
+    now = datetime.utcnow()
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    unflushed = activity_tracker.unflushed(session['user_id'], now)
 
-    # Add current session time if there's an active session
-    if 'activity_log_id' in session:
-        current_log = ActivityLog.query.get(session['activity_log_id'])
-        if current_log and not current_log.end_time:
-            current_duration = int((datetime.utcnow() - current_log.start_time).total_seconds() / 60)
-            total_time += current_duration
+    total_time = user_progress.total_time_minutes if user_progress else 0
+    total_time += sum(duration_minutes(start, end) for start, end in unflushed)
 
     # Calculate today's learning time
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_logs = ActivityLog.query.filter(
-        ActivityLog.user_id == session['user_id'],
-        ActivityLog.start_time >= today_start
-    ).all()
-
-    today_time = 0
-    for log in today_logs:
-        if log.end_time:
-            # Completed session
-            today_time += log.duration_minutes
-        elif 'activity_log_id' in session and log.id == session['activity_log_id']:
-            # Current active session
-            current_duration = int((datetime.utcnow() - log.start_time).total_seconds() / 60)
-            today_time += current_duration
-
-    # Get all test results
-    real_tests = TestResult.query.filter_by(user_id=session['user_id'], is_mock=False).order_by(TestResult.date.desc()).all()
-
-    # Get wrong answers for each real test
-    real_tests_with_mistakes = []
-    for test in real_tests:
-        wrong_answers = TestAnswer.query.filter_by(test_id=test.id, is_correct=False).all()
-        mistakes = []
-        seen_verbs = set()  # Track verbs to avoid duplicates
-        for answer in wrong_answers:
-            if answer.word_id:
-                word = Word.query.get(answer.word_id)
-                if word:
-                    mistakes.append(f"{word.article} {word.german}")
-            elif answer.verb_id:
-                verb = Verb.query.get(answer.verb_id)
-                if verb and verb.id not in seen_verbs:
-                    mistakes.append(verb.infinitive)
-                    seen_verbs.add(verb.id)
-        real_tests_with_mistakes.append({
-            'test': test,
-            'mistakes': mistakes
-        })
-
-    # Get mock test results for trending
-    mock_tests_raw = TestResult.query.filter_by(user_id=session['user_id'], is_mock=True).order_by(TestResult.date.desc()).limit(10).all()
-
-    # Get wrong answers for each mock test (if they have TestAnswer records)
-    mock_tests_with_mistakes = []
-    for test in mock_tests_raw:
-        wrong_answers = TestAnswer.query.filter_by(test_id=test.id, is_correct=False).all()
-        mistakes = []
-        seen_verbs = set()  # Track verbs to avoid duplicates
-        for answer in wrong_answers:
-            if answer.word_id:
-                word = Word.query.get(answer.word_id)
-                if word:
-                    mistakes.append(f"{word.article} {word.german}")
-            elif answer.verb_id:
-                verb = Verb.query.get(answer.verb_id)
-                if verb and verb.id not in seen_verbs:
-                    mistakes.append(verb.infinitive)
-                    seen_verbs.add(verb.id)
-        mock_tests_with_mistakes.append({
-            'test': test,
-            'mistakes': mistakes
-        })
+    today_time = db.session.scalar(
+        db.select(db.func.coalesce(db.func.sum(ActivityLog.duration_minutes), 0)).filter(
+            ActivityLog.user_id == session['user_id'],
+            ActivityLog.start_time >= today_start,
+            ActivityLog.end_time.isnot(None)
+        )
+    )
+    today_time += sum(duration_minutes(start, end) for start, end in unflushed if start >= today_start)
+
+    real_tests_with_mistakes, mock_tests_with_mistakes = get_test_history(session['user_id'])
 
     # Get totals for progress bars
-    total_words = Word.query.count()
-    total_verbs = Verb.query.count()
+    total_words = len(catalog.words())
+    total_verbs = len(catalog.verbs())
 
     return render_template('progress.html',
                          progress=user_progress,
@@ -474,61 +412,108 @@ def progress():
                          total_verbs=total_verbs)
 
 @app.route('/clear-mock-tests', methods=['POST'])
+@retry_on_busy
 def clear_mock_tests():
     if 'user_id' not in session:
         return jsonify({'error': 'Not logged in'}), 401
 
     # Delete all mock test results and associated answers for this user
-    mock_tests = TestResult.query.filter_by(user_id=session['user_id'], is_mock=True).all()
-    for test in mock_tests:
-        TestAnswer.query.filter_by(test_id=test.id).delete()
-    TestResult.query.filter_by(user_id=session['user_id'], is_mock=True).delete()
+    deleted = purge_user_history(session['user_id'], mock_tests=True)
     db.session.commit()
 
-    return '', 204
+    return jsonify({'deleted': deleted})
 
 @app.route('/clear-real-tests', methods=['POST'])
+@retry_on_busy
 def clear_real_tests():
     if 'user_id' not in session:
         return jsonify({'error': 'Not logged in'}), 401
 
     # Delete all real test results and associated answers for this user
-    real_tests = TestResult.query.filter_by(user_id=session['user_id'], is_mock=False).all()
-    for test in real_tests:
-        TestAnswer.query.filter_by(test_id=test.id).delete()
-    TestResult.query.filter_by(user_id=session['user_id'], is_mock=False).delete()
+    deleted = purge_user_history(session['user_id'], real_tests=True)
     db.session.commit()
 
-    return '', 204
+    return jsonify({'deleted': deleted})
 
 @app.route('/clear-all-progress', methods=['POST'])
+@retry_on_busy
 def clear_all_progress():
     if 'user_id' not in session:
         return jsonify({'error': 'Not logged in'}), 401
 
-    # Delete all test results and associated answers
-    all_tests = TestResult.query.filter_by(user_id=session['user_id']).all()
-    for test in all_tests:
-        TestAnswer.query.filter_by(test_id=test.id).delete()
-    TestResult.query.filter_by(user_id=session['user_id']).delete()
-
-    # Delete all word and verb progress
-    WordProgress.query.filter_by(user_id=session['user_id']).delete()
-    VerbProgress.query.filter_by(user_id=session['user_id']).delete()
-
-    # Reset user progress
-    user_progress = UserProgress.query.filter_by(user_id=session['user_id']).first()
-    if user_progress:
-        user_progress.words_learned = 0
-        user_progress.verbs_learned = 0
-        user_progress.total_time_minutes = 0
-
-    # Delete activity logs
-    ActivityLog.query.filter_by(user_id=session['user_id']).delete()
+    # Buffered answers are dropped first; a write of them that already started
+    # finishes before the delete below, which then removes it too
+    progress_buffer.discard(session['user_id'])
 
+    # Delete all test results, word/verb progress and activity logs, and reset the counters
+    deleted = purge_user_history(session['user_id'], mock_tests=True, real_tests=True, progress=True)
     db.session.commit()
+    activity_tracker.reset(session['user_id'])
+    priority_indexes.drop(session['user_id'])
+
+    return jsonify({'deleted': deleted})
+
+# Helper function to read the JSON object of the request body ({} without a JSON body, None if it is not an object)
+def json_object():
+    payload = request.get_json(silent=True)
+    if payload is None:
+        return {}
+    return payload if isinstance(payload, dict) else None
+
+# Helper function to check that the answer fields of a JSON item are strings (missing ones count as empty)
+def has_text_answers(item, fields):
+    return all(isinstance(item.get(field, ''), str) for field in fields)
+
+# Helper function to check an integer id from JSON (bool is an int subclass, but true is not an id)
+def is_item_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+# Practice decks: (kind of item, session key of the recently shown cards)
+PRACTICE_DECKS = {
+    'vocabulary': ('word', 'recent_vocabulary'),
+    'verbs': ('verb', 'recent_verbs'),
+}
+
+# Helper function to pick the next practice cards
+def next_cards(kind, recent, count=1):
+    """
+    Pick up to count cards of kind ('word' or 'verb') one after another, like
+    count page views: unseen items first, then seen items weighted by priority,
+    each pick skipping the last 10 cards shown (recent, then the cards picked
+    before it). Returns (cards, new recent history).
+    """
+    user_id = session['user_id']
+    recent = list(recent)
+    if app.config['CARD_SELECTION_MODE'] == 'sql':
+        progress_buffer.flush(user_id)
+    else:
+        index = priority_indexes.get(user_id, kind)
+        lookup = catalog.word if kind == 'word' else catalog.verb
 
-    return '', 204
+    cards = []
+    for _ in range(count):
+        if app.config['CARD_SELECTION_MODE'] == 'sql':
+            card, history_cleared = pick_card_sql(user_id, kind, recent)
+        else:
+            item_id, history_cleared = index.pick(recent)
+            card = lookup(item_id) if item_id is not None else None
+        if history_cleared:
+            # All cards recently shown - clear history and start fresh
+            recent = []
+        if card is None:
+            break
+        # Track this card in recent history (keep last 10)
+        recent = (recent + [card.id])[-10:]
+        cards.append(card)
+    return cards, recent
+
+# Helper function to turn a practice card into JSON for the deck API
+def card_json(kind, card):
+    if kind == 'word':
+        return {'id': card.id, 'german': card.german, 'article': card.article,
+                'english': card.english, 'level': card.level}
+    return dict({conj: getattr(card, conj) for conj in CONJUGATIONS},
+                id=card.id, infinitive=card.infinitive, english=card.english, level=card.level)
 
 @app.route('/learn-vocabulary')
 def learn_vocabulary():
@@ -538,144 +523,53 @@ def learn_vocabulary():
     if user and user.is_admin:
         return redirect(url_for('admin_dashboard'))
 
-    # Get all words and their progress
-    all_words = Word.query.all()
-    user_progress = WordProgress.query.filter_by(user_id=session['user_id']).all()
-    progress_dict = {p.word_id: p for p in user_progress}
+    # Select word with priority system, skipping recently shown words (prevent immediate repeats)
+    cards, recent_words = next_cards('word', session.get('recent_vocabulary', []))
+    if cards:
+        session['recent_vocabulary'] = recent_words
 
-    # Get recently shown words from session (prevent immediate repeats)
-    recent_words = session.get('recent_vocabulary', [])
-
-    # Separate unseen and seen words
-    unseen_words = [w for w in all_words if w.id not in progress_dict and w.id not in recent_words]
-    seen_words = [w for w in all_words if w.id in progress_dict and w.id not in recent_words]
-
-    # Select word with priority system
-    selected_word = None
-
-    if unseen_words:
-        # Prioritize unseen words - 90% chance to pick unseen
-        if random.random() < 0.9 or not seen_words:
-            # Pick randomly from unseen words (equal probability)
-            selected_word = random.choice(unseen_words)
-        else:
-            # 10% chance to review a seen word (weighted by priority)
-            word_weights = [(w, progress_dict[w.id].priority_score or 100.0) for w in seen_words]
-            words, weights = zip(*word_weights)
-            selected_word = random.choices(words, weights=weights, k=1)[0]
-    elif seen_words:
-        # All words seen - use weighted selection based on priority
-        word_weights = [(w, progress_dict[w.id].priority_score or 100.0) for w in seen_words]
-        words, weights = zip(*word_weights)
-        selected_word = random.choices(words, weights=weights, k=1)[0]
-    elif all_words and recent_words:
-        # All words recently shown - clear history and start fresh
-        session['recent_vocabulary'] = []
-        # Pick any word with weighted selection
-        word_weights = []
-        for word in all_words:
-            weight = progress_dict[word.id].priority_score if word.id in progress_dict else 100.0
-            word_weights.append((word, weight))
-        words, weights = zip(*word_weights)
-        selected_word = random.choices(words, weights=weights, k=1)[0]
-
-    # Track this word in recent history (keep last 10)
-    if selected_word:
-        recent_words.append(selected_word.id)
-        session['recent_vocabulary'] = recent_words[-10:]
-
-    return render_template('learn_vocabulary.html', word=selected_word)
+    return render_template('learn_vocabulary.html', word=cards[0] if cards else None)
 
 @app.route('/mark-word-learned/<int:word_id>')
+@retry_on_busy
 def mark_word_learned(word_id):
     if 'user_id' not in session:
         return redirect(url_for('login'))
 
-    progress = WordProgress.query.filter_by(user_id=session['user_id'], word_id=word_id).first()
-    if not progress:
-        progress = WordProgress(
-            user_id=session['user_id'],
-            word_id=word_id,
-            times_seen=0,
-            times_correct=0,
-            times_incorrect=0
-        )
-        db.session.add(progress)
-
-    progress.times_seen += 1
-    progress.last_seen = datetime.utcnow()
-
-    # Update user's total words learned count
-    user_progress = UserProgress.query.filter_by(user_id=session['user_id']).first()
-    if user_progress:
-        # Count unique words where user got at least one correct (truly "learned")
-        words_learned = WordProgress.query.filter_by(user_id=session['user_id']).filter(WordProgress.times_correct > 0).count()
-        user_progress.words_learned = words_learned
+    if catalog.word(word_id) is None:
+        abort(404)
 
+    new_priority = progress_buffer.record(session['user_id'], 'word', word_id)
     db.session.commit()
+    priority_indexes.update(session['user_id'], 'word', word_id, new_priority)
 
     return redirect(url_for('learn_vocabulary'))
 
 @app.route('/check-word/<int:word_id>', methods=['POST'])
+@retry_on_busy
 def check_word(word_id):
     if 'user_id' not in session:
         return jsonify({'error': 'Not logged in'}), 401
 
-    word = Word.query.get_or_404(word_id)
-    user_answer = request.form.get('answer', '').strip()
+    word = catalog.word(word_id)
+    if word is None:
+        abort(404)
 
     # Check answer with article flexibility and umlaut substitutions
-    correct_answer = word.german
-    correct_with_article = word.article + ' ' + word.german
-
-    # Normalize for umlaut substitutions
-    user_normalized = normalize_umlauts(user_answer.lower())
-    correct_normalized = normalize_umlauts(correct_answer.lower())
-    correct_with_article_normalized = normalize_umlauts(correct_with_article.lower())
-
-    # Accept with or without article
-    is_correct = (user_normalized == correct_normalized or
-                 user_normalized == correct_with_article_normalized)
+    grade = grade_word_answer(word, request.form.get('answer', ''))
 
     # Update progress
-    progress = WordProgress.query.filter_by(user_id=session['user_id'], word_id=word_id).first()
-    if not progress:
-        progress = WordProgress(
-            user_id=session['user_id'],
-            word_id=word_id,
-            times_seen=0,
-            times_correct=0,
-            times_incorrect=0
-        )
-        db.session.add(progress)
-
-    progress.times_seen += 1
-    if is_correct:
-        progress.times_correct += 1
-        # Decrease priority score when correct (make less likely to appear)
-        current_score = progress.priority_score if progress.priority_score is not None else 100.0
-        progress.priority_score = max(1.0, current_score * 0.7)
-    else:
-        progress.times_incorrect += 1
-        # Increase priority score when incorrect (make more likely to appear)
-        current_score = progress.priority_score if progress.priority_score is not None else 100.0
-        progress.priority_score = min(200.0, current_score * 1.5)
-    progress.last_seen = datetime.utcnow()
-
-    # Update user's total words learned count
-    user_progress = UserProgress.query.filter_by(user_id=session['user_id']).first()
-    if user_progress:
-        # Count unique words where user got at least one correct (truly "learned")
-        words_learned = WordProgress.query.filter_by(user_id=session['user_id']).filter(WordProgress.times_correct > 0).count()
-        user_progress.words_learned = words_learned
-
+    new_priority = progress_buffer.record(session['user_id'], 'word', word_id, grade.is_correct)
     db.session.commit()
+    priority_indexes.update(session['user_id'], 'word', word_id, new_priority)
 
     return jsonify({
-        'is_correct': is_correct,
-        'user_answer': user_answer,
-        'correct_answer': correct_with_article,
-        'english': word.english
+        'is_correct': grade.is_correct,
+        'user_answer': grade.user_answer,
+        'correct_answer': grade.correct_answer,
+        'english': word.english,
+        'match': grade.match,
+        'other_answer': grade.other_answer
     })
 
 @app.route('/learn-verbs')
@@ -686,128 +580,337 @@ def learn_verbs():
     if user and user.is_admin:
         return redirect(url_for('admin_dashboard'))
 
-    # Get all verbs and their progress
-    all_verbs = Verb.query.all()
-    user_progress = VerbProgress.query.filter_by(user_id=session['user_id']).all()
-    progress_dict = {p.verb_id: p for p in user_progress}
+    # Select verb with priority system, skipping recently shown verbs (prevent immediate repeats)
+    cards, recent_verbs = next_cards('verb', session.get('recent_verbs', []))
+    if cards:
+        session['recent_verbs'] = recent_verbs
+
+    return render_template('learn_verbs.html', verb=cards[0] if cards else None)
+
+@app.route('/check-verb/<int:verb_id>', methods=['POST'])
+@retry_on_busy
+def check_verb(verb_id):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+
+    verb = catalog.verb(verb_id)
+    if verb is None:
+        abort(404)
+
+    # Check all six conjugations (case-insensitive, with umlaut substitutions)
+    grade = grade_verb_answers(verb, request.form)
 
-    # Get recently shown verbs from session (prevent immediate repeats)
-    recent_verbs = session.get('recent_verbs', [])
+    # Update progress
+    new_priority = progress_buffer.record(session['user_id'], 'verb', verb_id, grade.all_correct)
+    db.session.commit()
+    priority_indexes.update(session['user_id'], 'verb', verb_id, new_priority)
 
-    # Separate unseen and seen verbs
-    unseen_verbs = [v for v in all_verbs if v.id not in progress_dict and v.id not in recent_verbs]
-    seen_verbs = [v for v in all_verbs if v.id in progress_dict and v.id not in recent_verbs]
+    return jsonify({'results': grade.as_dict(), 'all_correct': grade.all_correct})
 
-    # Select verb with priority system
-    selected_verb = None
+# Deck API: the browser fetches several cards at once and reports the answers in batches,
+# so drilling through a deck needs no request per card
+@app.route('/practice-deck/<deck>')
+@retry_on_busy
+def practice_deck(deck):
+    """The next ?count= cards of deck ('vocabulary' or 'verbs'), answers included"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    if deck not in PRACTICE_DECKS:
+        return jsonify({'error': 'Unknown deck'}), 404
+    kind, recent_key = PRACTICE_DECKS[deck]
 
-    if unseen_verbs:
-        # Prioritize unseen verbs - 90% chance to pick unseen
-        if random.random() < 0.9 or not seen_verbs:
-            # Pick randomly from unseen verbs (equal probability)
-            selected_verb = random.choice(unseen_verbs)
+    count = request.args.get('count', 10, type=int)
+    count = max(1, min(count, app.config['PRACTICE_DECK_MAX_CARDS']))
+    cards, recent = next_cards(kind, session.get(recent_key, []), count)
+    if cards:
+        session[recent_key] = recent
+
+    return jsonify({'cards': [card_json(kind, card) for card in cards]})
+
+@app.route('/practice-answers/<deck>', methods=['POST'])
+@retry_on_busy
+def practice_answers(deck):
+    """
+    Record a batch of practice answers of deck, in the order they were given.
+    The JSON body is {"answers": [...]}; each entry has the card "id" and
+    either "is_correct" (graded in the browser) or the answer itself ("answer"
+    for words, one key per conjugation for verbs), which is graded like
+    check-word/check-verb.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    if deck not in PRACTICE_DECKS:
+        return jsonify({'error': 'Unknown deck'}), 404
+    kind, _ = PRACTICE_DECKS[deck]
+    lookup = catalog.word if kind == 'word' else catalog.verb
+    fields = ('answer',) if kind == 'word' else CONJUGATIONS
+
+    payload = json_object()
+    submitted = payload.get('answers') if payload is not None else None
+    if (not isinstance(submitted, list) or len(submitted) > app.config['PRACTICE_MAX_ANSWERS']
+            or not all(isinstance(item, dict) for item in submitted)):
+        return jsonify({'error': 'Expected a list of answers'}), 400
+    if not all(has_text_answers(item, fields) for item in submitted):
+        return jsonify({'error': 'Answers must be strings'}), 400
+
+    graded, results = [], []
+    for item in submitted:
+        card = lookup(item.get('id')) if is_item_id(item.get('id')) else None
+        if card is None:
+            return jsonify({'error': f"Unknown card {item.get('id')!r}"}), 400
+        result = {'id': card.id}
+        if isinstance(item.get('is_correct'), bool):
+            is_correct = item['is_correct']
+        elif kind == 'word':
+            grade = grade_word_answer(card, item.get('answer', ''))
+            is_correct = grade.is_correct
+            result.update(correct_answer=grade.correct_answer, match=grade.match,
+                          other_answer=grade.other_answer)
         else:
-            # 10% chance to review a seen verb (weighted by priority)
-            verb_weights = [(v, progress_dict[v.id].priority_score or 100.0) for v in seen_verbs]
-            verbs, weights = zip(*verb_weights)
-            selected_verb = random.choices(verbs, weights=weights, k=1)[0]
-    elif seen_verbs:
-        # All verbs seen - use weighted selection based on priority
-        verb_weights = [(v, progress_dict[v.id].priority_score or 100.0) for v in seen_verbs]
-        verbs, weights = zip(*verb_weights)
-        selected_verb = random.choices(verbs, weights=weights, k=1)[0]
-    elif all_verbs and recent_verbs:
-        # All verbs recently shown - clear history and start fresh
-        session['recent_verbs'] = []
-        # Pick any verb with weighted selection
-        verb_weights = []
-        for verb in all_verbs:
-            weight = progress_dict[verb.id].priority_score if verb.id in progress_dict else 100.0
-            verb_weights.append((verb, weight))
-        verbs, weights = zip(*verb_weights)
-        selected_verb = random.choices(verbs, weights=weights, k=1)[0]
-
-    # Track this verb in recent history (keep last 10)
-    if selected_verb:
-        recent_verbs.append(selected_verb.id)
-        session['recent_verbs'] = recent_verbs[-10:]
-
-    return render_template('learn_verbs.html', verb=selected_verb)
+            grade = grade_verb_answers(card, item)
+            is_correct = grade.all_correct
+            result['results'] = grade.as_dict()
+        result['is_correct'] = is_correct
+        graded.append((kind, card.id, is_correct))
+        results.append(result)
+
+    # Update progress for the whole batch
+    new_priorities = progress_buffer.record_practice(session['user_id'], graded)
+    db.session.commit()
+    for (kind_, item_id), priority in new_priorities.items():
+        priority_indexes.update(session['user_id'], kind_, item_id, priority)
 
-@app.route('/check-verb/<int:verb_id>', methods=['POST'])
-def check_verb(verb_id):
+    return jsonify({'results': results})
+
+# Helper function to read the CEFR levels to include from ?levels=A1,A2 or a JSON list (None = all)
+def requested_levels(levels):
+    if not levels:
+        return None
+    if isinstance(levels, str):
+        levels = levels.split(',')
+    if not isinstance(levels, list) or not all(isinstance(level, str) for level in levels):
+        abort(400)
+    levels = {level.strip() for level in levels}
+    if not levels <= {'A1', 'A2', 'B1', 'B2', 'C1'}:
+        abort(400)
+    return levels
+
+# Offline practice: the browser caches the catalog bundle, grades practice answers itself
+# and sends the queued answers to /catalog-sync when it is back online
+@app.route('/catalog-bundle')
+def catalog_bundle():
+    """The word and verb catalog with normalised answers, as gzip JSON with a content-hash ETag"""
     if 'user_id' not in session:
         return jsonify({'error': 'Not logged in'}), 401
 
-    verb = Verb.query.get_or_404(verb_id)
+    bundle = catalog_bundles.get(requested_levels(request.args.get('levels')))
+    use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+    response = app.response_class(bundle.gzip_body if use_gzip else bundle.body, mimetype='application/json')
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    # Revalidate on every use; an unchanged catalog is answered with 304.
+    # Each encoding has its own ETag, as the bytes sent differ
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.set_etag(bundle.gzip_etag if use_gzip else bundle.etag)
+    return response.make_conditional(request)
+
+@app.route('/catalog-sync', methods=['POST'])
+@retry_on_busy
+def catalog_sync():
+    """
+    Record the answers given offline and return the catalog rows added since
+    the client's bundle. The JSON body is {"generation": bundle generation,
+    "levels": [...] (optional), "answers": [{"kind": "word"|"verb", "id",
+    "is_correct"}, ...] in the order they were given}. Answers to items that
+    no longer exist are skipped; "reset": true means the bundle must be
+    downloaded again. Ids and the generation must be integers.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
 
-    user_answers = {
-        'ich': request.form.get('ich', '').strip().lower(),
-        'du': request.form.get('du', '').strip().lower(),
-        'er_sie_es': request.form.get('er_sie_es', '').strip().lower(),
-        'wir': request.form.get('wir', '').strip().lower(),
-        'ihr': request.form.get('ihr', '').strip().lower(),
-        'sie_Sie': request.form.get('sie_Sie', '').strip().lower()
-    }
+    payload = json_object()
+    if payload is None:
+        return jsonify({'error': 'Expected a generation and a list of graded answers'}), 400
+    since = payload.get('generation')
+    submitted = payload.get('answers', [])
+    if (not isinstance(submitted, list) or len(submitted) > app.config['PRACTICE_MAX_ANSWERS']
+            or not all(isinstance(item, dict) and item.get('kind') in ('word', 'verb')
+                       and is_item_id(item.get('id'))
+                       and isinstance(item.get('is_correct'), bool) for item in submitted)
+            or not (since is None or is_item_id(since))):
+        return jsonify({'error': 'Expected a generation and a list of graded answers'}), 400
+    levels = requested_levels(payload.get('levels'))
+
+    graded, skipped = [], []
+    for item in submitted:
+        lookup = catalog.word if item['kind'] == 'word' else catalog.verb
+        if lookup(item['id']) is not None:
+            graded.append((item['kind'], item['id'], item['is_correct']))
+        else:
+            skipped.append({'kind': item['kind'], 'id': item['id']})
 
-    correct_answers = {
-        'ich': verb.ich.lower(),
-        'du': verb.du.lower(),
-        'er_sie_es': verb.er_sie_es.lower(),
-        'wir': verb.wir.lower(),
-        'ihr': verb.ihr.lower(),
-        'sie_Sie': verb.sie_Sie.lower()
-    }
+    new_priorities = progress_buffer.record_practice(session['user_id'], graded) if graded else {}
+    db.session.commit()
+    for (kind, item_id), priority in new_priorities.items():
+        priority_indexes.update(session['user_id'], kind, item_id, priority)
+
+    return jsonify(dict(catalog_changes(since, levels), recorded=len(graded), skipped=skipped))
+
+# Helper function to get the test in progress, starting a new one if there is none (or on ?restart=1)
+def get_or_start_test(test_type, is_mock, direction=None):
+    test = get_current_test()
+    # A test of another type, mode or direction in progress is replaced, like a restart
+    if (test is None or request.args.get('restart') or test.test_type != test_type
+            or test.is_mock != is_mock or test.direction != direction):
+        # Use weighted selection based on priority_score
+        if test_type == 'vocabulary':
+            questions = priority_indexes.get(session['user_id'], 'word').sample(10 if is_mock else 20)
+        else:
+            questions = priority_indexes.get(session['user_id'], 'verb').sample(4)
+        test = start_test(session['user_id'], test_type, questions, is_mock=is_mock, direction=direction)
+        db.session.commit()
+        session['test_id'] = test.id
+    return test
+
+# Helper function to list the unanswered questions of a test (prompts only) for the batch endpoints
+def remaining_questions(test):
+    questions = []
+    for question_id in question_ids(test)[test.current_question:]:
+        if test.test_type == 'vocabulary':
+            word = catalog.word(question_id)
+            prompt = word.matcher.german_answer if test.direction == 'de-en' else word.english
+            questions.append({'id': question_id, 'prompt': prompt})
+        else:
+            verb = catalog.verb(question_id)
+            questions.append({'id': question_id, 'prompt': verb.english, 'conjugations': list(CONJUGATIONS)})
+    return questions
+
+# Helper function to grade the answer to one test question
+def grade_test_question(test, question_id, form):
+    """
+    Grade form (a mapping with 'answer', or one answer per conjugation) for
+    question_id of test. Mock tests use the practice grading (near misses,
+    synonyms), real tests only accept exact answers.
+    Returns (answers to store, points, (kind, item_id, is_correct), JSON result).
+    """
+    if test.test_type == 'vocabulary':
+        word = catalog.word(question_id)
+        if test.is_mock:
+            # de-en: English (or a dictionary synonym) with or without "the"; en-de: German with or without
+            # article and with umlaut substitutions
+            grade = grade_word_answer(word, form.get('answer', ''), test.direction or 'de-en')
+        else:
+            # Real test is English→German: German answer with or without article,
+            # with umlaut substitutions (ä→ae, ö→oe, ü→ue, ß→ss); typos are never accepted here
+            grade = grade_word(word, form.get('answer', ''))
+        points = 1 if grade.is_correct else 0
 
-    results = {}
-    all_correct = True
-    for key in user_answers:
-        is_correct = user_answers[key] == correct_answers[key]
-        results[key] = {
-            'correct': is_correct,
-            'user_answer': user_answers[key],
-            'correct_answer': correct_answers[key]
+        # Store vocabulary answer for later display on progress page
+        answers = [{
+            'word_id': word.id,
+            'user_answer': grade.user_answer,
+            'correct_answer': grade.correct_answer,
+            'is_correct': grade.is_correct,
+            'question': word.english
+        }]
+        result = {
+            'is_correct': grade.is_correct,
+            'correct_answer': grade.correct_answer,
+            'match': grade.match,
+            'other_answer': grade.other_answer
         }
-        if not is_correct:
-            all_correct = False
+        return answers, points, ('word', word.id, grade.is_correct), result
+
+    # Verb test - check all 6 conjugations; progress counts it as correct only if all 6 are
+    verb = catalog.verb(question_id)
+    grade = grade_verb_answers(verb, form) if test.is_mock else grade_verb(verb, form)
+
+    # Store verb conjugation answers (one entry per conjugation for proper counting)
+    answers = [{
+        'verb_id': verb.id,
+        'user_answer': result.user_answer,
+        'correct_answer': result.correct_answer,
+        'is_correct': result.is_correct,
+        'question': f"{verb.english} ({conj})"
+    } for conj, result in grade.results.items()]
+    # Partial credit: each conjugation = 1/6 point
+    return answers, grade.correct_count / 6, ('verb', verb.id, grade.all_correct), {'results': grade.as_dict()}
+
+# Helper function to save a finished test
+def complete_test(user_id, test, answers, score):
+    """
+    Save the result and answers of test (None if there is none), update
+    progress for a real test, trim the test history and drop the test
+    session, all in the caller's transaction. score is the running score of a
+    mock test. Returns (test_complete.html context, new priorities).
+    """
+    is_mock = test.is_mock if test is not None else True
+    stored_test_type = test.test_type if test is not None else 'vocabulary'
+    new_priorities = {}
 
-    # Update progress
-    progress = VerbProgress.query.filter_by(user_id=session['user_id'], verb_id=verb_id).first()
-    if not progress:
-        progress = VerbProgress(
-            user_id=session['user_id'],
-            verb_id=verb_id,
-            times_seen=0,
-            times_correct=0,
-            times_incorrect=0
-        )
-        db.session.add(progress)
-
-    progress.times_seen += 1
-    if all_correct:
-        progress.times_correct += 1
-        # Decrease priority score when correct (make less likely to appear)
-        current_score = progress.priority_score if progress.priority_score is not None else 100.0
-        progress.priority_score = max(1.0, current_score * 0.7)
+    if is_mock:
+        # Mock test - we already tracked score, now save it
+        total = len(question_ids(test)) if test is not None else 0
     else:
-        progress.times_incorrect += 1
-        # Increase priority score when incorrect (make more likely to appear)
-        current_score = progress.priority_score if progress.priority_score is not None else 100.0
-        progress.priority_score = min(200.0, current_score * 1.5)
-    progress.last_seen = datetime.utcnow()
+        # Real test - calculate score from the answers
+        score = sum(1 for a in answers if a['is_correct'])
+        total = len(answers)
 
-    # Update user's total verbs learned count
-    user_progress = UserProgress.query.filter_by(user_id=session['user_id']).first()
-    if user_progress:
-        # Count unique verbs where user got at least one correct (truly "learned")
-        verbs_learned = VerbProgress.query.filter_by(user_id=session['user_id']).filter(VerbProgress.times_correct > 0).count()
-        user_progress.verbs_learned = verbs_learned
+    if total > 0:
+        test_result = TestResult(
+            user_id=user_id,
+            test_type=stored_test_type,
+            is_mock=is_mock,
+            score=score,
+            total=total,
+            percentage=(score / total) * 100
+        )
+        db.session.add(test_result)
+        db.session.flush()
 
-    db.session.commit()
+        # Save individual answers (mistakes are shown on the progress page)
+        save_test_answers(test_result.id, answers)
+
+        if not is_mock:
+            # Update progress for words/verbs (one query per kind for all answers)
+            new_priorities = progress_buffer.record_answers(user_id, [
+                ('word', answer['word_id'], answer['is_correct']) if answer.get('word_id')
+                else ('verb', answer['verb_id'], answer['is_correct'])
+                for answer in answers if answer.get('word_id') or answer.get('verb_id')
+            ], 'real')
+
+        if not is_mock:
+            # The overall grade averages the last 10 real tests
+            overall_grades.invalidate([user_id])
+
+        # Keep only the last 10 tests per type (or queue the cleanup in background mode)
+        test_retention.test_finished(user_id)
 
-    return jsonify({'results': results, 'all_correct': all_correct})
+    if test is not None:
+        finish_test(test)
+
+    percentage = (score / total * 100) if total > 0 else 0
+    grade = 'A' if percentage >= 90 else 'B' if percentage >= 80 else 'C' if percentage >= 70 else 'D' if percentage >= 60 else 'F'
+
+    # Get face and snarky comment based on performance
+    face_file, face_comment = get_face_and_comment(percentage)
+
+    summary = {
+        'score': score,
+        'total': total,
+        'percentage': percentage,
+        'grade': grade,
+        'is_mock': is_mock,
+        'test_answers': answers if not is_mock else [],
+        'test_type': stored_test_type,
+        'face_file': face_file,
+        'face_comment': face_comment
+    }
+    return summary, new_priorities
 
 @app.route('/mock-test/<test_type>/<direction>')
+@retry_on_busy
 def mock_test(test_type, direction):
     if 'user_id' not in session:
         return redirect(url_for('login'))
@@ -818,227 +921,55 @@ def mock_test(test_type, direction):
     if direction not in ['de-en', 'en-de']:
         return redirect(url_for('dashboard'))
 
-    # Initialize test session
-    if 'test_questions' not in session or request.args.get('restart'):
-        session['test_type'] = test_type
-        session['test_direction'] = direction
-        session['is_mock'] = True
-        session['current_question'] = 0
-        session['test_score'] = 0
-        session['test_answers'] = []
+    test = get_or_start_test(test_type, is_mock=True, direction=direction)
 
-        if test_type == 'vocabulary':
-            # Use weighted selection based on priority_score
-            all_words = Word.query.all()
-            user_progress = WordProgress.query.filter_by(user_id=session['user_id']).all()
-            progress_dict = {p.word_id: p for p in user_progress}
-
-            word_weights = []
-            for word in all_words:
-                weight = progress_dict[word.id].priority_score if word.id in progress_dict else 100.0
-                word_weights.append((word, weight))
-
-            if word_weights:
-                words, weights = zip(*word_weights)
-                selected_words = weighted_sample_without_replacement(words, weights, k=10)
-                session['test_questions'] = [w.id for w in selected_words]
-            else:
-                session['test_questions'] = []
-        else:
-            # Use weighted selection for verbs
-            all_verbs = Verb.query.all()
-            user_progress = VerbProgress.query.filter_by(user_id=session['user_id']).all()
-            progress_dict = {p.verb_id: p for p in user_progress}
-
-            verb_weights = []
-            for verb in all_verbs:
-                weight = progress_dict[verb.id].priority_score if verb.id in progress_dict else 100.0
-                verb_weights.append((verb, weight))
-
-            if verb_weights:
-                verbs, weights = zip(*verb_weights)
-                selected_verbs = weighted_sample_without_replacement(verbs, weights, k=4)
-                session['test_questions'] = [v.id for v in selected_verbs]
-            else:
-                session['test_questions'] = []
-
-    if session['current_question'] >= len(session['test_questions']):
+    question_id = current_question_id(test)
+    if question_id is None:
         return redirect(url_for('test_complete'))
 
-    question_id = session['test_questions'][session['current_question']]
-
     if test_type == 'vocabulary':
-        question = Word.query.get(question_id)
+        question = catalog.word(question_id)
     else:
-        question = Verb.query.get(question_id)
+        question = catalog.verb(question_id)
 
     return render_template('mock_test.html',
                          question=question,
                          test_type=test_type,
                          direction=direction,
-                         question_num=session['current_question'] + 1,
-                         total=len(session['test_questions']))
+                         question_num=test.current_question + 1,
+                         total=len(question_ids(test)))
 
 @app.route('/submit-mock-answer', methods=['POST'])
+@retry_on_busy
 def submit_mock_answer():
     if 'user_id' not in session:
         return jsonify({'error': 'Not logged in'}), 401
+    # Buffered practice answers go first, so they are applied before this one
+    progress_buffer.flush(session['user_id'])
 
-    test_type = session.get('test_type')
-    direction = session.get('test_direction', 'de-en')
-    question_id = session['test_questions'][session['current_question']]
+    test = get_current_test()
+    question_id = current_question_id(test) if test is not None else None
+    if question_id is None:
+        return jsonify({'error': 'No test in progress'}), 400
 
-    if test_type == 'vocabulary':
-        word = Word.query.get(question_id)
-        user_answer = request.form.get('answer', '').strip().lower()
-
-        if direction == 'de-en':
-            # German to English - accept with or without "the"
-            correct_answer = word.english.lower()
-            # Check if answer matches with or without article
-            is_correct = (user_answer == correct_answer or
-                         user_answer == 'the ' + correct_answer or
-                         'the ' + user_answer == correct_answer)
-        else:
-            # English to German - accept with or without article and with umlaut substitutions
-            # For comparison, use lowercase
-            correct_answer_compare = word.german.lower()
-            correct_with_article_compare = (word.article + ' ' + word.german).lower()
-
-            # Normalize both user answer and correct answers for comparison
-            user_normalized = normalize_umlauts(user_answer)
-            correct_normalized = normalize_umlauts(correct_answer_compare)
-            correct_with_article_normalized = normalize_umlauts(correct_with_article_compare)
-
-            is_correct = (user_normalized == correct_normalized or
-                         user_normalized == correct_with_article_normalized)
-            # For display purposes, show the version with article and proper capitalization
-            correct_answer = word.article + ' ' + word.german
-
-        # Update progress
-        progress = WordProgress.query.filter_by(user_id=session['user_id'], word_id=word.id).first()
-        if not progress:
-            progress = WordProgress(
-                user_id=session['user_id'],
-                word_id=word.id,
-                times_seen=0,
-                times_correct=0,
-                times_incorrect=0
-            )
-            db.session.add(progress)
-
-        progress.times_seen += 1
-        if is_correct:
-            progress.times_correct += 1
-            session['test_score'] += 1
-            # Decrease priority score when correct
-            current_score = progress.priority_score if progress.priority_score is not None else 100.0
-            progress.priority_score = max(1.0, current_score * 0.7)
-        else:
-            progress.times_incorrect += 1
-            # Increase priority score when incorrect
-            current_score = progress.priority_score if progress.priority_score is not None else 100.0
-            progress.priority_score = min(200.0, current_score * 1.5)
-        progress.last_seen = datetime.utcnow()
-
-    else:  # verb test - check all conjugations
-        verb = Verb.query.get(question_id)
-
-        # Get all 6 conjugation answers
-        conjugations = ['ich', 'du', 'er_sie_es', 'wir', 'ihr', 'sie_Sie']
-        results = {}
-        correct_count = 0
-
-        for conj in conjugations:
-            user_answer = request.form.get(conj, '').strip().lower()
-            correct_answer = getattr(verb, conj).lower()
-
-            # Normalize for umlaut substitutions
-            user_normalized = normalize_umlauts(user_answer)
-            correct_normalized = normalize_umlauts(correct_answer)
-
-            is_correct = user_normalized == correct_normalized
-            if is_correct:
-                correct_count += 1
-
-            results[conj] = {
-                'correct': is_correct,
-                'user_answer': user_answer,
-                'correct_answer': getattr(verb, conj)
-            }
-
-        # Update progress
-        progress = VerbProgress.query.filter_by(user_id=session['user_id'], verb_id=verb.id).first()
-        if not progress:
-            progress = VerbProgress(
-                user_id=session['user_id'],
-                verb_id=verb.id,
-                times_seen=0,
-                times_correct=0,
-                times_incorrect=0
-            )
-            db.session.add(progress)
-
-        progress.times_seen += 1
-        # Count as correct only if all 6 are correct
-        all_correct = correct_count == 6
-        if all_correct:
-            progress.times_correct += 1
-            # Decrease priority score when correct
-            current_score = progress.priority_score if progress.priority_score is not None else 100.0
-            progress.priority_score = max(1.0, current_score * 0.7)
-        else:
-            progress.times_incorrect += 1
-            # Increase priority score when incorrect
-            current_score = progress.priority_score if progress.priority_score is not None else 100.0
-            progress.priority_score = min(200.0, current_score * 1.5)
-        progress.last_seen = datetime.utcnow()
+    answers, points, progress_item, result = grade_test_question(test, question_id, request.form)
 
-        # Add partial credit to score (each conjugation = 1/6 point)
-        session['test_score'] += correct_count / 6
+    # Update progress
+    new_priorities = progress_buffer.record_answers(session['user_id'], [progress_item], 'mock')
 
-    db.session.commit()
+    if not record_test_answers(test, answers, points):
+        # The same question was submitted twice - keep the first answer only
+        db.session.rollback()
+        return jsonify({'error': 'Question already answered'}), 409
 
-    # Store answers for later display on progress page
-    if 'test_answers' not in session:
-        session['test_answers'] = []
+    db.session.commit()
+    for (kind, item_id), priority in new_priorities.items():
+        priority_indexes.update(session['user_id'], kind, item_id, priority)
 
-    if test_type == 'vocabulary':
-        # Store vocabulary answer
-        session['test_answers'].append({
-            'word_id': word.id,
-            'user_answer': user_answer,
-            'correct_answer': correct_answer,
-            'is_correct': is_correct,
-            'question': word.english
-        })
-    else:
-        # Store verb conjugation answers (one entry per conjugation for proper counting)
-        for conj in conjugations:
-            session['test_answers'].append({
-                'verb_id': verb.id,
-                'user_answer': results[conj]['user_answer'],
-                'correct_answer': results[conj]['correct_answer'],
-                'is_correct': results[conj]['correct'],
-                'question': f"{verb.english} ({conj})"
-            })
-
-    session['current_question'] += 1
-
-    # Return different format for verbs (with results) vs vocabulary
-    if test_type == 'verb':
-        return jsonify({
-            'results': results,
-            'has_more': session['current_question'] < len(session['test_questions'])
-        })
-    else:
-        return jsonify({
-            'is_correct': is_correct,
-            'correct_answer': correct_answer,
-            'has_more': session['current_question'] < len(session['test_questions'])
-        })
+    return jsonify(dict(result, has_more=has_more_questions(test)))
 
 @app.route('/real-test/<test_type>')
+@retry_on_busy
 def real_test(test_type):
     if 'user_id' not in session:
         return redirect(url_for('login'))
@@ -1052,306 +983,182 @@ def real_test(test_type):
         flash(f'You have already taken a real {test_type} test today. Come back tomorrow!', 'warning')
         return redirect(url_for('dashboard'))
 
-    # Initialize test session
-    if 'test_questions' not in session or request.args.get('restart'):
-        session['test_type'] = test_type
-        session['is_mock'] = False
-        session['current_question'] = 0
-        session['test_answers'] = []
+    test = get_or_start_test(test_type, is_mock=False)
 
-        if test_type == 'vocabulary':
-            # Use weighted selection based on priority_score
-            all_words = Word.query.all()
-            user_progress = WordProgress.query.filter_by(user_id=session['user_id']).all()
-            progress_dict = {p.word_id: p for p in user_progress}
-
-            word_weights = []
-            for word in all_words:
-                weight = progress_dict[word.id].priority_score if word.id in progress_dict else 100.0
-                word_weights.append((word, weight))
-
-            if word_weights:
-                words, weights = zip(*word_weights)
-                selected_words = weighted_sample_without_replacement(words, weights, k=20)
-                session['test_questions'] = [w.id for w in selected_words]
-            else:
-                session['test_questions'] = []
-        else:
-            # Use weighted selection for verbs
-            all_verbs = Verb.query.all()
-            user_progress = VerbProgress.query.filter_by(user_id=session['user_id']).all()
-            progress_dict = {p.verb_id: p for p in user_progress}
-
-            verb_weights = []
-            for verb in all_verbs:
-                weight = progress_dict[verb.id].priority_score if verb.id in progress_dict else 100.0
-                verb_weights.append((verb, weight))
-
-            if verb_weights:
-                verbs, weights = zip(*verb_weights)
-                selected_verbs = weighted_sample_without_replacement(verbs, weights, k=4)
-                session['test_questions'] = [v.id for v in selected_verbs]
-            else:
-                session['test_questions'] = []
-
-    if session['current_question'] >= len(session['test_questions']):
+    question_id = current_question_id(test)
+    if question_id is None:
         return redirect(url_for('test_complete'))
 
-    question_id = session['test_questions'][session['current_question']]
-
     if test_type == 'vocabulary':
-        question = Word.query.get(question_id)
+        question = catalog.word(question_id)
     else:
-        question = Verb.query.get(question_id)
+        question = catalog.verb(question_id)
 
     return render_template('real_test.html',
                          question=question,
                          test_type=test_type,
-                         question_num=session['current_question'] + 1,
-                         total=len(session['test_questions']))
+                         question_num=test.current_question + 1,
+                         total=len(question_ids(test)))
 
 @app.route('/submit-real-answer', methods=['POST'])
+@retry_on_busy
 def submit_real_answer():
     if 'user_id' not in session:
         return jsonify({'error': 'Not logged in'}), 401
 
-    test_type = session.get('test_type')
-    question_id = session['test_questions'][session['current_question']]
+    test = get_current_test()
+    question_id = current_question_id(test) if test is not None else None
+    if question_id is None:
+        return jsonify({'error': 'No test in progress'}), 400
 
-    if test_type == 'vocabulary':
-        user_answer = request.form.get('answer', '').strip()
-        word = Word.query.get(question_id)
-        # Real test is English→German, so check German answer with article
-        correct_answer = word.german
-        correct_with_article = word.article + ' ' + word.german
-
-        # Normalize for umlaut substitutions (ä→ae, ö→oe, ü→ue, ß→ss)
-        user_normalized = normalize_umlauts(user_answer.lower())
-        correct_normalized = normalize_umlauts(correct_answer.lower())
-        correct_with_article_normalized = normalize_umlauts(correct_with_article.lower())
-
-        # Accept with or without article
-        is_correct = (user_normalized == correct_normalized or
-                     user_normalized == correct_with_article_normalized)
-
-        session['test_answers'].append({
-            'word_id': word.id,
-            'user_answer': user_answer,
-            'correct_answer': correct_with_article,
-            'is_correct': is_correct,
-            'question': word.english
-        })
-    else:
-        # Verb test - check all 6 conjugations
-        verb = Verb.query.get(question_id)
-        conjugations = ['ich', 'du', 'er_sie_es', 'wir', 'ihr', 'sie_Sie']
-        correct_count = 0
-        all_answers = []
+    # No feedback until the test is complete; progress is updated at the end
+    answers, _, _, _ = grade_test_question(test, question_id, request.form)
+
+    if not record_test_answers(test, answers):
+        db.session.rollback()
+        return jsonify({'error': 'Question already answered'}), 409
+    db.session.commit()
+
+    return jsonify({
+        'has_more': has_more_questions(test)
+    })
 
-        for conj in conjugations:
-            user_answer = request.form.get(conj, '').strip()
-            correct_answer = getattr(verb, conj)
+# Batch mode: the client fetches every question of a test at once and submits all answers
+# in one request, which is graded, saved and completed in a single transaction
+@app.route('/mock-test/<test_type>/<direction>/questions')
+@retry_on_busy
+def mock_test_questions(test_type, direction):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
 
-            # Normalize for umlaut substitutions
-            user_normalized = normalize_umlauts(user_answer.lower())
-            correct_normalized = normalize_umlauts(correct_answer.lower())
+    if test_type not in ['vocabulary', 'verb'] or direction not in ['de-en', 'en-de']:
+        return jsonify({'error': 'Unknown test'}), 404
 
-            is_correct = user_normalized == correct_normalized
-            if is_correct:
-                correct_count += 1
+    test = get_or_start_test(test_type, is_mock=True, direction=direction)
+    return jsonify({
+        'test_type': test.test_type,
+        'is_mock': test.is_mock,
+        'direction': test.direction,
+        'questions': remaining_questions(test)
+    })
 
-            all_answers.append(f"{conj}: {user_answer}")
+@app.route('/real-test/<test_type>/questions')
+@retry_on_busy
+def real_test_questions(test_type):
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
 
-            # Store individual conjugation result
-            session['test_answers'].append({
-                'verb_id': verb.id,
-                'user_answer': user_answer,
-                'correct_answer': correct_answer,
-                'is_correct': is_correct,
-                'question': f"{verb.english} ({conj})"
-            })
+    if test_type not in ['vocabulary', 'verb']:
+        return jsonify({'error': 'Unknown test'}), 404
 
-    session['current_question'] += 1
+    test_type_normalized = 'verbs' if test_type == 'verb' else test_type
+    if not can_take_real_test(session['user_id'], test_type_normalized):
+        return jsonify({'error': f'You have already taken a real {test_type} test today'}), 403
 
+    test = get_or_start_test(test_type, is_mock=False)
     return jsonify({
-        'has_more': session['current_question'] < len(session['test_questions'])
+        'test_type': test.test_type,
+        'is_mock': test.is_mock,
+        'direction': test.direction,
+        'questions': remaining_questions(test)
     })
 
+@app.route('/submit-test-answers', methods=['POST'])
+@retry_on_busy
+def submit_test_answers():
+    """
+    Answer every remaining question of the current test at once. The JSON body
+    is {"answers": [...]} in question order, each {"question_id", "answer"}
+    (vocabulary) or {"question_id", "ich", "du", ...} (verbs). Returns the
+    result of each question and the test summary.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    # Buffered practice answers go first, so they are applied before these
+    progress_buffer.flush(session['user_id'])
+
+    test = get_current_test()
+    if test is None or not has_more_questions(test):
+        return jsonify({'error': 'No test in progress'}), 400
+
+    remaining = question_ids(test)[test.current_question:]
+    fields = ('answer',) if test.test_type == 'vocabulary' else CONJUGATIONS
+    payload = json_object()
+    submitted = payload.get('answers') if payload is not None else None
+    if (not isinstance(submitted, list) or len(submitted) != len(remaining)
+            or not all(isinstance(item, dict) for item in submitted)
+            or any(item.get('question_id', question_id) != question_id
+                   for item, question_id in zip(submitted, remaining))):
+        return jsonify({'error': 'Expected one answer per remaining question, in order'}), 400
+    if not all(has_text_answers(item, fields) for item in submitted):
+        return jsonify({'error': 'Answers must be strings'}), 400
+
+    # Grade everything in one pass
+    answers, points, progress_items, results = [], 0, [], []
+    for question_id, item in zip(remaining, submitted):
+        question_answers, question_points, progress_item, result = grade_test_question(test, question_id, item)
+        answers.extend(question_answers)
+        points += question_points
+        progress_items.append(progress_item)
+        results.append(dict(result, question_id=question_id))
+
+    all_answers = test_answers(test) + answers
+    score = test.score + points
+
+    new_priorities = {}
+    if test.is_mock:
+        new_priorities = progress_buffer.record_answers(session['user_id'], progress_items, 'mock')
+
+    if not record_test_answers(test, answers, points, questions=len(remaining)):
+        # Answered meanwhile (double submit or another tab)
+        db.session.rollback()
+        return jsonify({'error': 'Questions already answered'}), 409
+
+    summary, real_priorities = complete_test(session['user_id'], test, all_answers, score)
+    new_priorities.update(real_priorities)
+
+    # Answers, test result, progress and cleanup are committed together
+    db.session.commit()
+    session.pop('test_id', None)
+    for (kind, item_id), priority in new_priorities.items():
+        priority_indexes.update(session['user_id'], kind, item_id, priority)
+
+    return jsonify({'results': results, 'summary': summary})
+
 @app.route('/test-complete')
+@retry_on_busy
 def test_complete():
     if 'user_id' not in session:
         return redirect(url_for('login'))
+    progress_buffer.flush(session['user_id'])
 
-    is_mock = session.get('is_mock', True)
+    test = get_current_test()
+    answers = test_answers(test) if test is not None else []
+    score = test.score if test is not None else 0
+    summary, new_priorities = complete_test(session['user_id'], test, answers, score)
 
-    if is_mock:
-        # Mock test - we already tracked score, now save it
-        score = session.get('test_score', 0)
-        total = len(session.get('test_questions', []))
-        answers = session.get('test_answers', [])
-
-        if total > 0:
-            percentage = (score / total) * 100
-
-            # Save mock test result
-            test_result = TestResult(
-                user_id=session['user_id'],
-                test_type=session.get('test_type'),
-                is_mock=True,
-                score=score,
-                total=total,
-                percentage=percentage
-            )
-            db.session.add(test_result)
-            db.session.commit()
-
-            # Save individual answers for displaying mistakes on progress page
-            for answer in answers:
-                test_answer = TestAnswer(
-                    test_id=test_result.id,
-                    word_id=answer.get('word_id'),
-                    verb_id=answer.get('verb_id'),
-                    user_answer=answer['user_answer'],
-                    correct_answer=answer['correct_answer'],
-                    is_correct=answer['is_correct']
-                )
-                db.session.add(test_answer)
-
-            db.session.commit()
-
-            # Cycle old tests to keep only last 10 per type
-            cycle_old_tests(session['user_id'])
-    else:
-        # Real test - calculate score and save
-        answers = session.get('test_answers', [])
-        score = sum(1 for a in answers if a['is_correct'])
-        total = len(answers)
-        test_type = session.get('test_type')
-
-        if total > 0:
-            percentage = (score / total) * 100
-
-            # Save test result
-            test_result = TestResult(
-                user_id=session['user_id'],
-                test_type=session.get('test_type'),
-                is_mock=False,
-                score=score,
-                total=total,
-                percentage=percentage
-            )
-            db.session.add(test_result)
-            db.session.commit()
-
-            # Save individual answers
-            for answer in answers:
-                test_answer = TestAnswer(
-                    test_id=test_result.id,
-                    word_id=answer.get('word_id'),
-                    verb_id=answer.get('verb_id'),
-                    user_answer=answer['user_answer'],
-                    correct_answer=answer['correct_answer'],
-                    is_correct=answer['is_correct']
-                )
-                db.session.add(test_answer)
-
-            # Update progress for words/verbs
-            for answer in answers:
-                if 'word_id' in answer and answer['word_id']:
-                    progress = WordProgress.query.filter_by(
-                        user_id=session['user_id'],
-                        word_id=answer['word_id']
-                    ).first()
-                    if not progress:
-                        progress = WordProgress(
-                            user_id=session['user_id'],
-                            word_id=answer['word_id'],
-                            times_seen=0,
-                            times_correct=0,
-                            times_incorrect=0
-                        )
-                        db.session.add(progress)
-                    progress.times_seen += 1
-                    if answer['is_correct']:
-                        progress.times_correct += 1
-                        # Decrease priority score when correct
-                        current_score = progress.priority_score if progress.priority_score is not None else 100.0
-                        progress.priority_score = max(1.0, current_score * 0.7)
-                    else:
-                        progress.times_incorrect += 1
-                        # Increase priority score when incorrect
-                        current_score = progress.priority_score if progress.priority_score is not None else 100.0
-                        progress.priority_score = min(200.0, current_score * 1.5)
-                    progress.last_seen = datetime.utcnow()
-
-                elif 'verb_id' in answer and answer['verb_id']:
-                    progress = VerbProgress.query.filter_by(
-                        user_id=session['user_id'],
-                        verb_id=answer['verb_id']
-                    ).first()
-                    if not progress:
-                        progress = VerbProgress(
-                            user_id=session['user_id'],
-                            verb_id=answer['verb_id'],
-                            times_seen=0,
-                            times_correct=0,
-                            times_incorrect=0
-                        )
-                        db.session.add(progress)
-                    progress.times_seen += 1
-                    if answer['is_correct']:
-                        progress.times_correct += 1
-                        # Decrease priority score when correct
-                        current_score = progress.priority_score if progress.priority_score is not None else 100.0
-                        progress.priority_score = max(1.0, current_score * 0.7)
-                    else:
-                        progress.times_incorrect += 1
-                        # Increase priority score when incorrect
-                        current_score = progress.priority_score if progress.priority_score is not None else 100.0
-                        progress.priority_score = min(200.0, current_score * 1.5)
-                    progress.last_seen = datetime.utcnow()
-
-            db.session.commit()
-
-            # Cycle old tests to keep only last 10 per type
-            cycle_old_tests(session['user_id'])
-
-    # Store answers and test type before clearing session
-    test_answers = session.get('test_answers', []) if not is_mock else []
-    stored_test_type = session.get('test_type', 'vocabulary')
-
-    # Clear test session
-    session.pop('test_questions', None)
-    session.pop('test_type', None)
-    session.pop('is_mock', None)
-    session.pop('current_question', None)
-    session.pop('test_score', None)
-    session.pop('test_answers', None)
-
-    percentage = (score / total * 100) if total > 0 else 0
-    grade = 'A' if percentage >= 90 else 'B' if percentage >= 80 else 'C' if percentage >= 70 else 'D' if percentage >= 60 else 'F'
-
-    # Get face and snarky comment based on performance
-    face_file, face_comment = get_face_and_comment(percentage)
+    # Clear test session; the result, answers, progress and cleanup are committed together
+    db.session.commit()
+    session.pop('test_id', None)
+    for (kind, item_id), priority in new_priorities.items():
+        priority_indexes.update(session['user_id'], kind, item_id, priority)
 
-    return render_template('test_complete.html',
-                         score=score,
-                         total=total,
-                         percentage=percentage,
-                         grade=grade,
-                         is_mock=is_mock,
-                         test_answers=test_answers,
-                         test_type=stored_test_type,
-                         face_file=face_file,
-                         face_comment=face_comment)
+    return render_template('test_complete.html', **summary)
 
 @app.route('/admin')
 @admin_required
 def admin_dashboard():
     return render_template('admin_dashboard.html')
 
+@app.route('/admin/db-stats')
+@admin_required
+def admin_db_stats():
+    """Counters of the busy-retry layer (see db_retry.py)"""
+    return jsonify({'busy_retries': retry_stats.as_dict()})
+
 @app.route('/admin/import-words', methods=['GET', 'POST'])
 @admin_required
+@retry_on_busy
 def admin_import_words():
     if request.method == 'POST':
         csv_data = request.form.get('csv_data', '')
@@ -1396,6 +1203,8 @@ def admin_import_words():
             db.session.add(word)
             imported_count += 1
 
+        if imported_count:
+            bump_catalog_generation()
         db.session.commit()
 
         flash(f'Successfully imported {imported_count} words. Skipped {skipped_count} duplicates.')
@@ -1409,6 +1218,7 @@ def admin_import_words():
 
 @app.route('/admin/import-verbs', methods=['GET', 'POST'])
 @admin_required
+@retry_on_busy
 def admin_import_verbs():
     if request.method == 'POST':
         csv_data = request.form.get('csv_data', '')
@@ -1463,6 +1273,8 @@ def admin_import_verbs():
             db.session.add(verb)
             imported_count += 1
 
+        if imported_count:
+            bump_catalog_generation()
         db.session.commit()
 
         flash(f'Successfully imported {imported_count} verbs. Skipped {skipped_count} duplicates.')
@@ -1475,4 +1287,7 @@ def admin_import_verbs():
     return render_template('admin_import_verbs.html')
 
 if __name__ == '__main__':
+    # Load the vocabulary catalog up front so the first card is served from memory
+    with app.app_context():
+        catalog.load()
     app.run(host='0.0.0.0', port=8000, debug=True)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the hot paths of the app (card selection, test
+generation, answer submission and grading).
+Runs against synthetic data; the database benchmarks use a temporary SQLite
+file, so the app's database is never touched:
+
+    python benchmark.py
+"""
+import os
+import random
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, event, text
+
+from db_profile import SQLITE_PRAGMAS, SQLITE_ENGINE_OPTIONS, apply_pragmas
+from grading import CONJUGATIONS, WordMatcher, VerbMatcher, TYPO
+from models import db
+from sampling import WeightedIndex
+from selection import PriorityIndex
+
+CATALOG_SIZES = [100, 1000, 10000, 100000]
+
+def timed(fn, repeat):
+    """Return the average seconds per call of fn over repeat calls"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+def naive_weighted_sample(items, weights, k, rng):
+    # The original implementation: random.choices + list.index + pop, k times
+    available_items = list(items)
+    available_weights = list(weights)
+    selected = []
+    for _ in range(min(k, len(available_items))):
+        chosen = rng.choices(available_items, weights=available_weights, k=1)[0]
+        selected.append(chosen)
+        idx = available_items.index(chosen)
+        available_items.pop(idx)
+        available_weights.pop(idx)
+    return selected
+
+def bench_real_test_sampling():
+    """Pick 20 real-test questions from catalogs of growing size"""
+    print("Real test question sampling (k=20), ms per test")
+    print(f"{'words':>8} {'naive':>10} {'Fenwick':>10}")
+    rng = random.Random(42)
+    for size in CATALOG_SIZES:
+        items = list(range(size))
+        weights = [rng.uniform(1.0, 200.0) for _ in items]
+        index = WeightedIndex(weights)
+        repeat = max(3, 20000 // size)
+
+        naive = timed(lambda: naive_weighted_sample(items, weights, 20, rng), min(repeat, 20))
+        fenwick = timed(lambda: index.sample(20, rng), 200)
+        print(f"{size:>8} {naive * 1000:>10.3f} {fenwick * 1000:>10.3f}")
+    print()
+
+def naive_next_card(item_ids, progress, recent, rng):
+    # The original learn_vocabulary selection: rebuild both lists on every card
+    unseen = [i for i in item_ids if i not in progress and i not in recent]
+    seen = [i for i in item_ids if i in progress and i not in recent]
+    if unseen and (rng.random() < 0.9 or not seen):
+        return rng.choice(unseen)
+    return rng.choices(seen, weights=[progress[i] for i in seen], k=1)[0]
+
+def bench_next_card():
+    """Pick the next flashcard for a user who has seen half of the catalog"""
+    print("Next card selection, ms per card")
+    print(f"{'words':>8} {'naive':>10} {'index':>10}")
+    rng = random.Random(42)
+    for size in CATALOG_SIZES:
+        item_ids = list(range(size))
+        progress = {i: rng.uniform(1.0, 200.0) for i in item_ids[::2]}
+        recent = item_ids[:10]
+        index = PriorityIndex(item_ids, progress)
+        repeat = max(3, 20000 // size)
+
+        naive = timed(lambda: naive_next_card(item_ids, progress, recent, rng), repeat)
+        indexed = timed(lambda: index.pick(recent, rng), 2000)
+        print(f"{size:>8} {naive * 1000:>10.3f} {indexed * 1000:>10.3f}")
+    print()
+
+# The statement check_word runs for every answer
+ANSWER_UPSERT = text("""
+    INSERT INTO word_progress (user_id, word_id, times_seen, times_correct, times_incorrect, priority_score)
+    VALUES (:user_id, :word_id, 1, 1, 0, 70.0)
+    ON CONFLICT (user_id, word_id) DO UPDATE SET
+        times_seen = times_seen + 1,
+        times_correct = times_correct + 1,
+        priority_score = max(1.0, coalesce(priority_score, 100.0) * 0.7)
+""")
+
+def submit_answers(path, pragmas, writers, answers_per_writer):
+    """
+    Run writers threads that each commit answers_per_writer answers.
+    Returns (answers per second, number of "database is locked" errors).
+    """
+    engine = create_engine(f"sqlite:///{path}", **SQLITE_ENGINE_OPTIONS)
+    if pragmas:
+        event.listen(engine, 'connect', lambda conn, record: apply_pragmas(conn, pragmas))
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO user (id, username, password) VALUES (:id, :name, 'x')"),
+                     [{'id': i, 'name': f'user{i}'} for i in range(1, writers + 1)])
+        conn.execute(text("INSERT INTO word (id, german, english, article) VALUES (:id, 'Wort', 'word', 'das')"),
+                     [{'id': i} for i in range(1, 201)])
+
+    errors = []
+    def writer(user_id):
+        rng = random.Random(user_id)
+        for _ in range(answers_per_writer):
+            try:
+                with engine.begin() as conn:
+                    conn.execute(ANSWER_UPSERT, {'user_id': user_id, 'word_id': rng.randint(1, 200)})
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(user_id,)) for user_id in range(1, writers + 1)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    return (writers * answers_per_writer - len(errors)) / elapsed, len(errors)
+
+def bench_concurrent_answers(answers_per_writer=200):
+    """Answer submissions per second with concurrent writers, default vs tuned SQLite profile"""
+    print(f"Concurrent answer submission ({answers_per_writer} answers per writer), answers/s")
+    print(f"{'writers':>8} {'default':>10} {'errors':>7} {'tuned':>10} {'errors':>7}")
+    # Without the profile, SQLite uses journal_mode=DELETE and synchronous=FULL
+    default_pragmas = {'journal_mode': 'DELETE', 'synchronous': 'FULL'}
+    for writers in (1, 4, 8):
+        row = []
+        for pragmas in (default_pragmas, SQLITE_PRAGMAS):
+            with tempfile.TemporaryDirectory() as directory:
+                rate, errors = submit_answers(os.path.join(directory, 'bench.db'), pragmas,
+                                              writers, answers_per_writer)
+            row.append(f"{rate:>10.0f} {errors:>7}")
+        print(f"{writers:>8} {' '.join(row)}")
+    print()
+
+def legacy_normalize_umlauts(text):
+    # The original normalisation: one str.replace per umlaut
+    replacements = {'ä': 'ae', 'Ä': 'Ae', 'ö': 'oe', 'Ö': 'Oe', 'ü': 'ue', 'Ü': 'Ue', 'ß': 'ss'}
+    for umlaut, replacement in replacements.items():
+        text = text.replace(umlaut, replacement)
+    return text
+
+def legacy_grade_word(word, answer):
+    # The original route logic: the answer and both accepted forms normalised per call
+    user_normalized = legacy_normalize_umlauts(answer.strip().lower())
+    return (user_normalized == legacy_normalize_umlauts(word.german.lower()) or
+            user_normalized == legacy_normalize_umlauts((word.article + ' ' + word.german).lower()))
+
+def legacy_grade_verb(verb, answers):
+    return sum(legacy_normalize_umlauts(answers[conj].strip().lower())
+               == legacy_normalize_umlauts(getattr(verb, conj).lower()) for conj in CONJUGATIONS)
+
+def synthetic_vocabulary(rng, size):
+    syllables = ['ba', 'ch', 'ei', 'fü', 'ge', 'hä', 'ka', 'lö', 'mu', 'ne', 'ra', 'ße', 'st', 'te', 'ung']
+    make = lambda: ''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+    words = [SimpleNamespace(german=make().capitalize(), english=make(), article=rng.choice(['der', 'die', 'das']))
+             for _ in range(size)]
+    verbs = [SimpleNamespace(**{conj: make() for conj in CONJUGATIONS}) for _ in range(size)]
+    return words, verbs
+
+def bench_grading(answers=100000):
+    """Answers graded per second in a bulk re-grading job, route logic vs prebuilt matchers"""
+    print(f"Grading {answers} answers, answers/s")
+    print(f"{'kind':>8} {'legacy':>12} {'matchers':>12}")
+    rng = random.Random(42)
+    words, verbs = synthetic_vocabulary(rng, 1000)
+    word_matchers = [WordMatcher(w.german, w.english, w.article) for w in words]
+    verb_matchers = [VerbMatcher(v) for v in verbs]
+
+    # Correct answers with and without article or umlauts, and wrong ones
+    word_jobs = []
+    for _ in range(answers):
+        i = rng.randrange(len(words))
+        word = words[i]
+        answer = rng.choice([word.german, f"{word.article} {word.german}",
+                             legacy_normalize_umlauts(word.german).upper(), 'falsch'])
+        word_jobs.append((i, answer))
+    verb_jobs = []
+    for _ in range(answers // len(CONJUGATIONS)):
+        i = rng.randrange(len(verbs))
+        verb_jobs.append((i, {conj: rng.choice([getattr(verbs[i], conj), 'falsch'])
+                              for conj in CONJUGATIONS}))
+
+    def rate(fn, jobs, per_job=1):
+        start = time.perf_counter()
+        for i, answer in jobs:
+            fn(i, answer)
+        return len(jobs) * per_job / (time.perf_counter() - start)
+
+    legacy = rate(lambda i, answer: legacy_grade_word(words[i], answer), word_jobs)
+    matcher = rate(lambda i, answer: word_matchers[i].grade(answer), word_jobs)
+    print(f"{'word':>8} {legacy:>12.0f} {matcher:>12.0f}")
+    legacy = rate(lambda i, answer: legacy_grade_verb(verbs[i], answer), verb_jobs, len(CONJUGATIONS))
+    matcher = rate(lambda i, answer: verb_matchers[i].grade(answer), verb_jobs, len(CONJUGATIONS))
+    print(f"{'verb':>8} {legacy:>12.0f} {matcher:>12.0f}")
+    print()
+
+def misspell(rng, text):
+    # One random deletion, insertion or substitution
+    i = rng.randrange(len(text))
+    edit = rng.choice(('delete', 'insert', 'substitute'))
+    if edit == 'delete':
+        return text[:i] + text[i + 1:]
+    if edit == 'insert':
+        return text[:i] + rng.choice('aeiou') + text[i:]
+    return text[:i] + rng.choice('xyz') + text[i + 1:]
+
+def bench_near_miss_grading(answers=20000):
+    """Microseconds per answer with near-miss grading (typo_distance=2) as the catalog grows"""
+    print(f"Near-miss grading of {answers} answers, us per answer")
+    print(f"{'words':>8} {'exact':>10} {'near-miss':>10} {'typos':>7}")
+    rng = random.Random(42)
+    for size in CATALOG_SIZES:
+        words, _ = synthetic_vocabulary(rng, size)
+        matchers = [WordMatcher(w.german, w.english, w.article) for w in words]
+        known_forms = {}
+        for matcher in matchers:
+            for key in matcher.german_keys:
+                known_forms.setdefault(key, matcher.german_answer)
+
+        # Half misspelled, a quarter another word, a quarter correct
+        jobs = []
+        for _ in range(answers):
+            i = rng.randrange(size)
+            roll = rng.random()
+            if roll < 0.5:
+                answer = misspell(rng, words[i].german)
+            elif roll < 0.75:
+                answer = words[rng.randrange(size)].german
+            else:
+                answer = words[i].german
+            jobs.append((matchers[i], answer))
+
+        start = time.perf_counter()
+        for matcher, answer in jobs:
+            matcher.grade(answer)
+        exact = (time.perf_counter() - start) / answers
+        start = time.perf_counter()
+        typos = sum(matcher.grade(answer, 'en-de', 2, known_forms).match == TYPO for matcher, answer in jobs)
+        near_miss = (time.perf_counter() - start) / answers
+        print(f"{size:>8} {exact * 1e6:>10.2f} {near_miss * 1e6:>10.2f} {typos:>7}")
+    print()
+
+if __name__ == '__main__':
+    bench_real_test_sampling()
+    bench_next_card()
+    bench_concurrent_answers()
+    bench_grading()
+    bench_near_miss_grading()
@@ -0,0 +1,165 @@
+"""
+In-memory catalog of all Words and Verbs.
+
+The catalog is loaded once per process and served from memory, so picking a
+card no longer builds an ORM object for every row in the word/verb tables.
+Anything that changes those tables must call bump_catalog_generation() inside
+its transaction (with deleted=True when it removed rows); every process
+compares the stored generation with the one it loaded and reloads when they
+differ. The bump also stamps new rows with the generation that added them, so
+changes since a given generation can be listed (see catalog_bundle.py).
+
+Every entry also carries its grading matcher (grading.py) with the accepted
+answers already normalised, built once per load instead of per answer, and
+answer_forms() maps every normalised answer of the catalog to its display form
+for near-miss grading.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from sqlalchemy import text
+
+from models import db, Word, Verb
+from grading import WordMatcher, VerbMatcher
+
+CatalogWord = namedtuple('CatalogWord', ['id', 'german', 'english', 'article', 'level', 'generation', 'matcher'])
+CatalogVerb = namedtuple('CatalogVerb', ['id', 'infinitive', 'english', 'ich', 'du',
+                                         'er_sie_es', 'wir', 'ihr', 'sie_Sie', 'level', 'generation', 'matcher'])
+
+def read_catalog_generation():
+    """Return the generation stored in the catalog_version table (0 if unset)"""
+    generation = db.session.execute(
+        text('SELECT generation FROM catalog_version WHERE id = 1')
+    ).scalar()
+    return generation or 0
+
+def read_deleted_generation():
+    """Return the last generation that removed Word/Verb rows (0 if none)"""
+    generation = db.session.execute(
+        text('SELECT deleted_generation FROM catalog_version WHERE id = 1')
+    ).scalar()
+    return generation or 0
+
+def bump_catalog_generation(deleted=False):
+    """
+    Mark the Word/Verb tables as changed; deleted=True records that rows were
+    removed. Rows added since the last bump are stamped with the new
+    generation. Runs in the caller's transaction, so the bump is committed
+    together with the change itself. Returns the new generation.
+    """
+    # Rows added through the ORM but not flushed yet need their stamp too
+    db.session.flush()
+    result = db.session.execute(
+        text('UPDATE catalog_version SET generation = generation + 1'
+             + (', deleted_generation = generation + 1' if deleted else '') + ' WHERE id = 1')
+    )
+    if result.rowcount == 0:
+        db.session.execute(
+            text('INSERT INTO catalog_version (id, generation, deleted_generation) VALUES (1, 1, :deleted)'),
+            {'deleted': 1 if deleted else 0}
+        )
+    generation = read_catalog_generation()
+    for table in ('word', 'verb'):
+        db.session.execute(
+            text(f'UPDATE {table} SET generation = :generation WHERE generation IS NULL'),
+            {'generation': generation}
+        )
+    catalog.invalidate()
+    return generation
+
+class VocabularyCatalog:
+    """Process-wide cache of the Word and Verb tables"""
+
+    def __init__(self, check_interval=1.0):
+        # Seconds between generation checks against the database
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._generation = None
+        self._checked_at = 0.0
+        self._words = []
+        self._verbs = []
+        self._words_by_id = {}
+        self._verbs_by_id = {}
+        self._answer_forms = {}
+        self._snapshot = (None, 0, [], [])
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def invalidate(self):
+        """Force a generation check on the next access"""
+        self._checked_at = 0.0
+
+    def load(self):
+        """(Re)load both tables; needs an application context"""
+        with self._lock:
+            generation = read_catalog_generation()
+            deleted_generation = read_deleted_generation()
+            words = [CatalogWord(*row, WordMatcher(row.german, row.english, row.article)) for row in db.session.execute(
+                db.select(Word.id, Word.german, Word.english, Word.article, Word.level, Word.generation)
+                .order_by(Word.id)
+            )]
+            verbs = [CatalogVerb(*row, VerbMatcher(row)) for row in db.session.execute(
+                db.select(Verb.id, Verb.infinitive, Verb.english, Verb.ich, Verb.du,
+                          Verb.er_sie_es, Verb.wir, Verb.ihr, Verb.sie_Sie, Verb.level, Verb.generation)
+                .order_by(Verb.id)
+            )]
+
+            # {normalised answer: display form}; the first entry wins for homonyms
+            answer_forms = {'en-de': {}, 'de-en': {}, 'verb': {}}
+            for w in words:
+                for key in w.matcher.german_keys:
+                    answer_forms['en-de'].setdefault(key, w.matcher.german_answer)
+                answer_forms['de-en'].setdefault(w.matcher.english_key, w.english)
+            for v in verbs:
+                for conj, key in v.matcher.keys.items():
+                    answer_forms['verb'].setdefault(key, v.matcher.forms[conj])
+
+            # Swap in the new lists in one go so readers never see a half-loaded catalog
+            self._words_by_id = {w.id: w for w in words}
+            self._verbs_by_id = {v.id: v for v in verbs}
+            self._answer_forms = answer_forms
+            self._words = words
+            self._verbs = verbs
+            self._generation = generation
+            self._snapshot = (generation, deleted_generation, words, verbs)
+            self._checked_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        now = time.monotonic()
+        if self._generation is not None and now - self._checked_at < self.check_interval:
+            return
+        if self._generation is None or read_catalog_generation() != self._generation:
+            self.load()
+        else:
+            self._checked_at = now
+
+    def words(self):
+        self._ensure_fresh()
+        return self._words
+
+    def verbs(self):
+        self._ensure_fresh()
+        return self._verbs
+
+    def word(self, word_id):
+        self._ensure_fresh()
+        return self._words_by_id.get(word_id)
+
+    def verb(self, verb_id):
+        self._ensure_fresh()
+        return self._verbs_by_id.get(verb_id)
+
+    def snapshot(self):
+        """(generation, deleted_generation, words, verbs) of the same load"""
+        self._ensure_fresh()
+        return self._snapshot
+
+    def answer_forms(self, kind):
+        """{normalised answer: display form} of all German words ('en-de'), English meanings ('de-en') or conjugations ('verb')"""
+        self._ensure_fresh()
+        return self._answer_forms[kind]
+
+catalog = VocabularyCatalog()
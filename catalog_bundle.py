@@ -0,0 +1,129 @@
+"""
+Offline catalog bundle and delta sync.
+
+The bundle is the whole Word and Verb catalog as gzip-compressed JSON,
+together with the normalised answer forms from grading.py, so the browser can
+cache it and grade practice answers itself with the check-word/check-verb
+rules:
+
+- an answer is normalised by lower-casing it and spelling out umlauts
+  (bundle['normalisation']['umlauts']); an English answer also loses a
+  leading "the "
+- a word is answered correctly when the normalised answer is one of its
+  answers['en-de'] (German, with or without article) or answers['de-en']
+- a verb conjugation is correct when it equals answers[conjugation]
+
+Bundles are built once per catalog generation (and level filter) and served
+with a content hash as ETag (one per encoding, since the plain and gzip bytes
+differ), so an unchanged catalog costs the client one 304.
+catalog_changes() lists the rows added since the generation a client has; when
+rows were removed since then the client has to download the bundle again.
+"""
+import gzip
+import hashlib
+import json
+import threading
+from collections import namedtuple
+
+from catalog import catalog
+from grading import CONJUGATIONS, UMLAUT_TABLE
+
+BUNDLE_FORMAT = 1
+
+Bundle = namedtuple('Bundle', ['generation', 'etag', 'body', 'gzip_etag', 'gzip_body'])
+
+def word_entry(word):
+    """Bundle entry of a catalog word"""
+    return {
+        'id': word.id,
+        'german': word.german,
+        'article': word.article,
+        'english': word.english,
+        'level': word.level,
+        'generation': word.generation,
+        'answers': {
+            'en-de': sorted(word.matcher.german_keys),
+            'de-en': [word.matcher.english_key],
+        },
+    }
+
+def verb_entry(verb):
+    """Bundle entry of a catalog verb"""
+    entry = {
+        'id': verb.id,
+        'infinitive': verb.infinitive,
+        'english': verb.english,
+        'level': verb.level,
+        'generation': verb.generation,
+        'answers': dict(verb.matcher.keys),
+    }
+    entry.update((conj, getattr(verb, conj)) for conj in CONJUGATIONS)
+    return entry
+
+def _in_levels(item, levels):
+    return levels is None or item.level in levels
+
+def catalog_changes(since, levels=None):
+    """
+    Rows the client with catalog generation since is missing, as
+    {'generation', 'reset', 'words', 'verbs'}. reset is True when rows were
+    removed after since (or since is unknown); the client then needs the whole
+    bundle and no rows are listed.
+    """
+    generation, deleted_generation, words, verbs = catalog.snapshot()
+    reset = since is None or since > generation or deleted_generation > since
+    if reset:
+        return {'generation': generation, 'reset': True, 'words': [], 'verbs': []}
+
+    # Rows without a stamp were added outside bump_catalog_generation(); send them to be safe
+    def changed(item):
+        return (item.generation is None or item.generation > since) and _in_levels(item, levels)
+
+    return {
+        'generation': generation,
+        'reset': False,
+        'words': [word_entry(w) for w in words if changed(w)],
+        'verbs': [verb_entry(v) for v in verbs if changed(v)],
+    }
+
+class CatalogBundleCache:
+    """Encoded bundles of the current catalog generation, one per level filter"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        self._bundles = {}
+
+    def _build(self, words, verbs, generation, levels):
+        payload = {
+            'format': BUNDLE_FORMAT,
+            'generation': generation,
+            'levels': sorted(levels) if levels is not None else None,
+            'normalisation': {
+                'umlauts': {chr(char): replacement for char, replacement in UMLAUT_TABLE.items()},
+                'lowercase': True,
+                'strip_english': ['the '],
+            },
+            'words': [word_entry(w) for w in words if _in_levels(w, levels)],
+            'verbs': [verb_entry(v) for v in verbs if _in_levels(v, levels)],
+        }
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+        # mtime=0 keeps the compressed bytes identical for identical content
+        gzip_body = gzip.compress(body, mtime=0)
+        return Bundle(generation, hashlib.sha256(body).hexdigest(), body,
+                      hashlib.sha256(gzip_body).hexdigest(), gzip_body)
+
+    def get(self, levels=None):
+        """Bundle of the current catalog, restricted to levels (a set) if given; needs an app context"""
+        generation, _, words, verbs = catalog.snapshot()
+        key = frozenset(levels) if levels is not None else None
+        with self._lock:
+            if generation != self._generation:
+                self._bundles = {}
+                self._generation = generation
+            bundle = self._bundles.get(key)
+            if bundle is None:
+                bundle = self._bundles[key] = self._build(words, verbs, generation, key)
+        return bundle
+
+catalog_bundles = CatalogBundleCache()
@@ -1,5 +1,18 @@
 from app import app, db
-from models import Word
+from models import Word, WordProgress, TestAnswer, AnswerEvent
+from catalog import bump_catalog_generation
+from progress import reconcile_learned_counts
+
+def delete_words(words):
+    # Progress, test answers and logged answers reference the words, so they have to go first
+    word_ids = [word.id for word in words]
+    AnswerEvent.query.filter(AnswerEvent.word_id.in_(word_ids)).delete(synchronize_session=False)
+    WordProgress.query.filter(WordProgress.word_id.in_(word_ids)).delete(synchronize_session=False)
+    TestAnswer.query.filter(TestAnswer.word_id.in_(word_ids)).delete(synchronize_session=False)
+    for word in words:
+        db.session.delete(word)
+    reconcile_learned_counts()
+    bump_catalog_generation(deleted=True)
 
 def cleanup_words():
     with app.app_context():
@@ -38,16 +51,14 @@ def cleanup_words():
         # Delete non-nouns
         if words_to_delete:
             print(f"\n\nDeleting {len(words_to_delete)} non-nouns...")
-            for word in words_to_delete:
-                db.session.delete(word)
+            delete_words(words_to_delete)
             db.session.commit()
             print("✓ Deleted non-nouns")
 
         # For nouns without articles, try to infer from common patterns
         # This is basic - you might want to manually review these
         print(f"\n\nRemoving {len(nouns_without_articles)} nouns without articles...")
-        for word in nouns_without_articles:
-            db.session.delete(word)
+        delete_words(nouns_without_articles)
         db.session.commit()
         print("✓ Deleted nouns without articles")
 
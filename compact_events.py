@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Script to fold pending answer events into the progress tables and, if
+ANSWER_EVENT_RETENTION_DAYS is set, prune applied events older than that.
+With --rebuild, every user's word/verb progress is recomputed from the whole
+answer log instead (e.g. after changing the scoring formula in progress.py).
+"""
+import sys
+
+from app import app, db
+from answer_events import compact_events, prune_events, rebuild_progress, uncovered_progress
+
+def main():
+    with app.app_context():
+        if '--rebuild' not in sys.argv:
+            folded = compact_events()
+            print(f"✓ Folded {folded} pending events into the progress tables")
+            retention_days = app.config.get('ANSWER_EVENT_RETENTION_DAYS')
+            if retention_days is not None:
+                pruned = prune_events(retention_days)
+                print(f"✓ Pruned {pruned} applied events older than {retention_days} days")
+            return
+
+        uncovered = uncovered_progress()
+        if uncovered:
+            print(f"✗ {uncovered} word/verb progress rows have answers that are not in the answer log")
+            print("  (recorded before the log existed, or pruned); rebuilding would lose them")
+            return 1
+
+        print("Rebuilding word/verb progress from the answer log...")
+        folded = rebuild_progress()
+        db.session.commit()
+        print(f"✓ Rebuilt progress from {folded} events")
+        print("Running instances pick up the new priorities within 5 minutes")
+
+if __name__ == '__main__':
+    sys.exit(main())
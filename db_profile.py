@@ -0,0 +1,88 @@
+"""
+SQLite connection profile.
+
+Every new connection gets the PRAGMAs in SQLITE_PRAGMAS (or
+app.config['SQLITE_PRAGMAS']):
+
+- journal_mode=WAL: readers no longer block the writer and a commit appends
+  to the log instead of rewriting the database pages
+- synchronous=NORMAL: with WAL, fsync only at checkpoints; a power loss can
+  drop the last commits but never corrupts the database
+- cache_size / mmap_size: keep the (small) database in memory
+- temp_store=MEMORY: sorts and temp B-trees of the window-function queries stay in RAM
+- busy_timeout: wait for the write lock instead of failing with "database is locked"
+- foreign_keys=ON: SQLite only enforces foreign keys (and ON DELETE CASCADE)
+  when asked to, per connection
+
+Before foreign keys are enforced, the first connection of an engine runs
+PRAGMA foreign_key_check. A database that still has rows pointing to deleted
+words, verbs or tests (left by older versions of cleanup_words.py) keeps
+enforcement off and logs a warning; migrate_remove_orphans.py removes those
+rows.
+
+SQLITE_ENGINE_OPTIONS sizes the connection pool for SQLite: there is only
+one writer at a time, so a few pooled connections are enough.
+"""
+import logging
+import sqlite3
+import threading
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,           # Negative = KiB, so 16 MB
+    'mmap_size': 64 * 1024 * 1024,  # 64 MB
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,           # Milliseconds
+    'foreign_keys': 'ON',
+}
+
+SQLITE_ENGINE_OPTIONS = {
+    'pool_size': 5,
+    'max_overflow': 5,
+    'pool_timeout': 30,
+}
+
+def apply_pragmas(dbapi_connection, pragmas):
+    """Run PRAGMA name=value for every entry on a raw sqlite3 connection"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+def foreign_key_violations(dbapi_connection):
+    """{table: number of rows} whose foreign key points to a missing row"""
+    violations = {}
+    cursor = dbapi_connection.cursor()
+    for table, *_ in cursor.execute('PRAGMA foreign_key_check').fetchall():
+        violations[table] = violations.get(table, 0) + 1
+    cursor.close()
+    return violations
+
+def listen_for_connections(engine, pragmas=None):
+    """Apply the profile to every connection engine opens from now on"""
+    pragmas = dict(SQLITE_PRAGMAS if pragmas is None else pragmas)
+    lock = threading.Lock()
+    checked = False
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        nonlocal checked
+        with lock:
+            if not checked and str(pragmas.get('foreign_keys', '')).upper() in ('ON', '1', 'TRUE'):
+                violations = foreign_key_violations(dbapi_connection)
+                if violations:
+                    pragmas['foreign_keys'] = 'OFF'
+                    logger.warning("Foreign keys are not enforced: rows with dangling references in %s - "
+                                   "run migrate_remove_orphans.py",
+                                   ', '.join(f"{table} ({rows})" for table, rows in sorted(violations.items())))
+                checked = True
+        apply_pragmas(dbapi_connection, pragmas)
@@ -0,0 +1,109 @@
+"""
+Retrying write requests on SQLITE_BUSY.
+
+busy_timeout makes SQLite wait for the write lock, but some conflicts fail
+immediately with "database is locked" (e.g. a transaction that read first and
+then tries to write after another connection committed). Routes decorated
+with @retry_on_busy are re-run from the start when that happens: the database
+session is rolled back, the Flask session is restored to what it was when the
+request came in, and the view runs again after a jittered exponential
+backoff. Retries stop at the deadline.
+
+A request that already committed is never re-run, so the retry cannot apply
+a change twice. retry_stats counts retries and give-ups for /admin/db-stats.
+"""
+import copy
+import random
+import threading
+import time
+from functools import wraps
+
+from flask import g, has_app_context, session
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from models import db
+
+RETRY_DEADLINE = 10.0     # Seconds a request may spend retrying
+RETRY_BASE_DELAY = 0.01   # First backoff step in seconds, doubled per retry
+RETRY_MAX_DELAY = 0.5
+
+_BUSY_MESSAGES = ('database is locked', 'database is busy', 'database table is locked')
+
+class RetryStats:
+    """Thread-safe counters of the retry layer"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0   # Requests that hit at least one busy error
+        self.retries = 0    # Re-runs after a busy error
+        self.recovered = 0  # Requests that succeeded after retrying
+        self.give_ups = 0   # Requests that failed with a busy error in the end
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self):
+        with self._lock:
+            return {'requests': self.requests, 'retries': self.retries,
+                    'recovered': self.recovered, 'give_ups': self.give_ups}
+
+retry_stats = RetryStats()
+
+def is_busy_error(error):
+    if not isinstance(error, OperationalError):
+        return False
+    message = str(error.orig).lower()
+    return any(busy in message for busy in _BUSY_MESSAGES)
+
+@event.listens_for(Session, 'after_commit')
+def count_commit(db_session):
+    # Lets retry_on_busy see whether the current request already committed
+    if has_app_context():
+        g.db_commits = g.get('db_commits', 0) + 1
+
+def backoff_delay(retry, rng=random):
+    """Full-jitter exponential backoff for the given retry number (0-based)"""
+    return rng.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** retry))
+
+def retry_on_busy(view=None, deadline=RETRY_DEADLINE):
+    """
+    Decorator for routes that write to the database (usable with or without
+    arguments). On a busy/locked OperationalError the request is rolled back
+    and run again, until it succeeds or deadline seconds have passed.
+    """
+    if view is None:
+        return lambda view: retry_on_busy(view, deadline)
+
+    @wraps(view)
+    def decorated_function(*args, **kwargs):
+        started = time.monotonic()
+        flask_session = copy.deepcopy(dict(session))
+        retry = 0
+        while True:
+            commits = g.get('db_commits', 0)
+            try:
+                result = view(*args, **kwargs)
+            except OperationalError as e:
+                db.session.rollback()
+                if not is_busy_error(e):
+                    raise
+                delay = backoff_delay(retry)
+                # Re-running a request that already committed would apply that part twice
+                if (g.get('db_commits', 0) != commits
+                        or time.monotonic() - started + delay > deadline):
+                    retry_stats.add(requests=1 if retry == 0 else 0, give_ups=1)
+                    raise
+                retry_stats.add(requests=1 if retry == 0 else 0, retries=1)
+                session.clear()
+                session.update(copy.deepcopy(flask_session))
+                time.sleep(delay)
+                retry += 1
+                continue
+            if retry:
+                retry_stats.add(recovered=1)
+            return result
+    return decorated_function
@@ -1,5 +1,7 @@
 from app import app, db
-from models import Word, WordProgress, TestAnswer
+from models import Word, WordProgress, TestAnswer, AnswerEvent
+from catalog import bump_catalog_generation
+from progress import reconcile_learned_counts
 
 def delete_words_after_105():
     with app.app_context():
@@ -24,6 +26,8 @@ def delete_words_after_105():
         if progress_count > 0:
             print(f"  Deleting {progress_count} WordProgress records...")
             WordProgress.query.filter(WordProgress.word_id.in_(word_ids_to_delete)).delete(synchronize_session='fetch')
+            # Deleted rows may have counted towards words_learned
+            reconcile_learned_counts()
             db.session.commit()
             print(f"  ✓ Deleted {progress_count} WordProgress records")
 
@@ -35,9 +39,18 @@ def delete_words_after_105():
             db.session.commit()
             print(f"  ✓ Deleted {test_answer_count} TestAnswer records")
 
+        # Delete logged answers
+        event_count = AnswerEvent.query.filter(AnswerEvent.word_id.in_(word_ids_to_delete)).count()
+        if event_count > 0:
+            print(f"  Deleting {event_count} AnswerEvent records...")
+            AnswerEvent.query.filter(AnswerEvent.word_id.in_(word_ids_to_delete)).delete(synchronize_session='fetch')
+            db.session.commit()
+            print(f"  ✓ Deleted {event_count} AnswerEvent records")
+
         # Now delete the words
         print(f"\nDeleting {words_to_delete} words with id > 105...")
         Word.query.filter(Word.id > 105).delete(synchronize_session='fetch')
+        bump_catalog_generation(deleted=True)
         db.session.commit()
         print(f"✓ Deleted {words_to_delete} words")
 
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Script to print the SQLite query plan (EXPLAIN QUERY PLAN) of every query shape the routes run
+and flag the ones that scan a whole table instead of using an index.
+Also checks that the progress page runs the same number of queries however long a user's test history is.
+Exits with status 1 if an unexpected full table scan or a growing query count is found.
+"""
+import sys
+from datetime import datetime
+
+from sqlalchemy import event
+
+from app import app, db, get_test_history
+from models import (User, Word, Verb, UserProgress, WordProgress, VerbProgress,
+                    TestResult, TestAnswer, ActivityLog, TestSession, AnswerEvent)
+from selection import _sql_pick_statement
+from catalog import catalog
+from retention import retention_delete_statement
+from answer_events import uncovered_progress_statement
+
+def route_queries():
+    """(route, description, statement, expect_full_scan) for every hot query shape"""
+    now = datetime.utcnow()
+    queries = [
+        ('login', 'user by username/password',
+         db.select(User).filter_by(username='sam', password='sam'), False),
+        ('every page', 'overall grade: last 10 real tests',
+         db.select(TestResult).filter_by(user_id=1, is_mock=False).order_by(TestResult.date.desc()).limit(10), False),
+        ('every page', 'activity: user progress row',
+         db.select(UserProgress).filter_by(user_id=1), False),
+        ('real_test', 'real test already taken today',
+         db.select(TestResult).filter(TestResult.user_id == 1, TestResult.is_mock == False,
+                                      TestResult.test_type == 'vocabulary', TestResult.date >= now).limit(1), False),
+        ('test_complete', 'cycle_old_tests: ranked delete', retention_delete_statement([1]), False),
+        ('progress', "today's activity logs",
+         db.select(db.func.sum(ActivityLog.duration_minutes)).filter(
+             ActivityLog.user_id == 1, ActivityLog.start_time >= now, ActivityLog.end_time.isnot(None)), False),
+        ('progress', 'real tests by date',
+         db.select(TestResult).filter_by(user_id=1, is_mock=False).order_by(TestResult.date.desc()), False),
+        ('progress', 'wrong answers of all tests of a user',
+         db.select(TestAnswer.test_id, TestAnswer.word_id, TestAnswer.verb_id)
+         .join(TestResult, TestAnswer.test_id == TestResult.id)
+         .filter(TestResult.user_id == 1, TestAnswer.is_correct == False), False),
+        ('clear_*', 'purge answers of a user',
+         db.delete(TestAnswer).where(TestAnswer.test_id.in_(
+             db.select(TestResult.id).where(TestResult.user_id == 1, TestResult.is_mock == True))), False),
+        ('clear_*', 'purge tests of a user',
+         db.delete(TestResult).where(TestResult.user_id == 1, TestResult.is_mock == True), False),
+        ('mock_test/real_test', 'test in progress',
+         db.select(TestSession).filter(TestSession.id == 'x', TestSession.user_id == 1,
+                                       TestSession.expires_at >= now), False),
+        ('mock_test/real_test', 'purge expired tests',
+         db.delete(TestSession).where(TestSession.expires_at < now), False),
+        ('learn_vocabulary', 'priority index: word progress of a user',
+         db.select(WordProgress.word_id, WordProgress.priority_score).filter_by(user_id=1), False),
+        ('learn_verbs', 'priority index: verb progress of a user',
+         db.select(VerbProgress.verb_id, VerbProgress.priority_score).filter_by(user_id=1), False),
+        ('check_word', 'progress row of one word',
+         db.select(WordProgress).filter_by(user_id=1, word_id=1), False),
+        ('check_verb', 'progress row of one verb',
+         db.select(VerbProgress).filter_by(user_id=1, verb_id=1), False),
+        ('check_word (events mode)', 'pending events of a user',
+         db.select(AnswerEvent).where(AnswerEvent.user_id == 1, AnswerEvent.applied == False,
+                                      AnswerEvent.word_id.in_([1])).order_by(AnswerEvent.id), False),
+        ('compaction', 'oldest pending events',
+         db.select(AnswerEvent).where(AnswerEvent.applied == False).order_by(AnswerEvent.id).limit(500), False),
+        ('compaction', 'claim a batch of events',
+         db.update(AnswerEvent).where(AnswerEvent.id.in_([1, 2]), AnswerEvent.applied == False)
+         .values(applied=True), False),
+        ('compact_events.py --rebuild', 'word progress without events behind it',
+         uncovered_progress_statement('word', [1]), False),
+        ('compact_events.py --rebuild', 'verb progress without events behind it',
+         uncovered_progress_statement('verb', [1]), False),
+        ('compact_events.py', 'prune old applied events',
+         db.delete(AnswerEvent).where(AnswerEvent.id.in_(
+             db.select(AnswerEvent.id).where(AnswerEvent.applied == True, AnswerEvent.created_at < now)
+             .limit(500).scalar_subquery())), False),
+        ('admin_import_words', 'duplicate check',
+         db.select(Word).filter_by(german='Haus', article='das').limit(1), False),
+        ('admin_import_verbs', 'duplicate check',
+         db.select(Verb).filter_by(infinitive='gehen').limit(1), False),
+        # Loading the catalog reads every row on purpose
+        ('catalog', 'load all words', db.select(Word.id, Word.german).order_by(Word.id), True),
+        ('catalog', 'load all verbs', db.select(Verb.id, Verb.infinitive).order_by(Verb.id), True),
+    ]
+    # CARD_SELECTION_MODE = 'sql': listing unseen items has to walk the catalog table
+    for kind in ('word', 'verb'):
+        for mode in ('unseen', 'seen', 'any'):
+            queries.append((f'learn ({kind}, sql mode)', f'pick {mode} card',
+                            _sql_pick_statement(kind, mode).bindparams(recent=[0], user_id=1, r=0.5),
+                            mode != 'seen'))
+    return queries
+
+def explain(statement):
+    compiled = statement.compile(dialect=db.engine.dialect, compile_kwargs={'render_postcompile': True})
+    # Parameter values do not change the plan, so every placeholder gets NULL
+    params = tuple(None for _ in (compiled.positiontup or ()))
+    rows = db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled), params)
+    return [row[3] for row in rows]
+
+def is_full_scan(detail, subqueries=()):
+    # Only "SEARCH ... USING ..." seeks into an index. "SCAN word" reads the whole table, and
+    # "SCAN word USING (COVERING) INDEX ..." still reads every entry of an index.
+    # Scans of subqueries and CTEs read rows that were already found through an index.
+    if not detail.startswith('SCAN '):
+        return False
+    if detail.split()[1] in subqueries:
+        return False
+    return not detail.startswith(('SCAN (', 'SCAN candidates', 'SCAN CONSTANT ROW'))
+
+def subquery_names(plan):
+    # Names of the co-routines and materialized subqueries that appear in a plan
+    return {detail.split()[1] for detail in plan if detail.startswith(('CO-ROUTINE ', 'MATERIALIZE '))}
+
+def count_queries(fn):
+    """Run fn() and return how many statements it sent to the database"""
+    statements = []
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        fn()
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    return len(statements)
+
+def progress_query_counts(history_sizes=(1, 10, 50)):
+    """
+    Number of queries get_test_history() needs for a user with a growing number of tests.
+    The test data is created in a transaction that is rolled back afterwards.
+    """
+    word_ids = [word.id for word in catalog.words()[:5]]
+    verb_ids = [verb.id for verb in catalog.verbs()[:2]]
+    counts = {}
+    try:
+        user = User(username='__explain_queries__', password='-')
+        db.session.add(user)
+        db.session.flush()
+        created = 0
+        for size in history_sizes:
+            for i in range(created, size):
+                test = TestResult(user_id=user.id, test_type='vocabulary', is_mock=i % 2 == 0,
+                                  score=0, total=7, percentage=0.0)
+                db.session.add(test)
+                db.session.flush()
+                db.session.add_all([TestAnswer(test_id=test.id, word_id=word_id, is_correct=False)
+                                    for word_id in word_ids])
+                db.session.add_all([TestAnswer(test_id=test.id, verb_id=verb_id, is_correct=False)
+                                    for verb_id in verb_ids])
+            created = size
+            db.session.flush()
+            counts[size] = count_queries(lambda: get_test_history(user.id))
+    finally:
+        db.session.rollback()
+    return counts
+
+def report():
+    unexpected = 0
+    with app.app_context():
+        for route, description, statement, expect_full_scan in route_queries():
+            plan = explain(statement)
+            full_scans = [detail for detail in plan if is_full_scan(detail, subquery_names(plan))]
+            if not full_scans:
+                verdict = 'index'
+            elif expect_full_scan:
+                verdict = 'full scan (expected)'
+            else:
+                verdict = 'FULL SCAN'
+                unexpected += 1
+
+            print(f"[{verdict}] {route}: {description}")
+            for detail in plan:
+                print(f"    {detail}")
+
+        print()
+        counts = progress_query_counts()
+        print("Progress page test history: " + ", ".join(
+            f"{size} tests -> {queries} queries" for size, queries in counts.items()))
+        if len(set(counts.values())) > 1:
+            print("✗ The number of queries grows with the test history")
+            unexpected += 1
+
+    print()
+    if unexpected:
+        print(f"✗ {unexpected} problems found - run migrate_add_indexes.py?")
+        return 1
+    print("✓ Every query uses an index and the progress page query count is constant")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(report())
@@ -0,0 +1,86 @@
+"""
+Server-side cache of every user's overall grade (the average of their last 10
+real tests), so rendering a page does not query test_result.
+
+Code that changes a user's test history calls overall_grades.invalidate()
+inside its transaction (complete_test, cycle_old_tests, purge_user_history).
+The cached grade is dropped right away and again when the transaction
+commits, and a grade computed while the history was changing is not stored.
+Entries expire after max_age seconds, which bounds how long another process
+can serve a grade that was invalidated elsewhere.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import db
+
+_PENDING_KEY = 'overall_grade_invalidations'
+
+class OverallGradeCache:
+    """user_id -> (letter grade, percentage, face) of recently active users"""
+
+    def __init__(self, max_users=1024, max_age=60):
+        self.max_users = max_users
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._grades = OrderedDict()
+        # Bumped on every invalidation, so a grade computed meanwhile is not stored
+        self._versions = {}
+        self._all_version = 0
+
+    def _version(self, user_id):
+        return self._all_version, self._versions.get(user_id, 0)
+
+    def get(self, user_id, compute):
+        """The cached grade of user_id, or compute(user_id) stored for next time"""
+        with self._lock:
+            entry = self._grades.get(user_id)
+            if entry is not None and time.monotonic() - entry[0] <= self.max_age:
+                self._grades.move_to_end(user_id)
+                return entry[1]
+            version = self._version(user_id)
+
+        grade = compute(user_id)
+        with self._lock:
+            if self._version(user_id) == version:
+                self._grades[user_id] = (time.monotonic(), grade)
+                self._grades.move_to_end(user_id)
+                while len(self._grades) > self.max_users:
+                    self._grades.popitem(last=False)
+        return grade
+
+    def _drop(self, user_ids):
+        with self._lock:
+            if user_ids is None:
+                self._grades.clear()
+                self._versions.clear()
+                self._all_version += 1
+                return
+            for user_id in user_ids:
+                self._grades.pop(user_id, None)
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def invalidate(self, user_ids=None, db_session=None):
+        """
+        Forget the grades of user_ids (None = every user), now and once
+        db_session (the Flask-SQLAlchemy session by default) commits.
+        """
+        self._drop(user_ids)
+        db_session = db_session if db_session is not None else db.session
+        pending = db_session.info.setdefault(_PENDING_KEY, [])
+        pending.append(None if user_ids is None else list(user_ids))
+
+overall_grades = OverallGradeCache()
+
+@event.listens_for(Session, 'after_commit')
+def invalidate_committed_grades(db_session):
+    for user_ids in db_session.info.pop(_PENDING_KEY, []):
+        overall_grades._drop(user_ids)
+
+@event.listens_for(Session, 'after_rollback')
+def forget_rolled_back_grades(db_session):
+    db_session.info.pop(_PENDING_KEY, None)
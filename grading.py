@@ -0,0 +1,198 @@
+"""
+Answer grading shared by practice, mock tests and real tests.
+
+Answers are compared lower-cased and with umlauts spelled out
+(ä -> ae, ö -> oe, ü -> ue, ß -> ss), so learners without a German keyboard
+can still answer. normalize_answer() does both in a single str.translate()
+pass.
+
+Every catalog entry carries a matcher with its accepted answers already
+normalised (WordMatcher, VerbMatcher), built once per catalog load. Grading
+an answer then normalises only what the user typed and compares strings:
+
+- German answers: with or without the article ("Bank" or "die Bank")
+- English answers: with or without "the" ("bank" or "the bank")
+- Verbs: each of the six conjugations on its own
+
+grade_word() / grade_verb() return structured results (Grade, VerbGrade).
+
+German -> English answers may also be any English gloss the bundled
+dictionaries list for the word ('synonym', see synonyms.py); synonyms is a
+dict of normalised gloss -> German lemmas, so this is one lookup as well.
+
+Near-miss grading is optional (typo_distance > 0). An answer that is not
+exact is classified as
+- 'other_word': it is exactly another entry of the catalog (known_forms, a
+  dict of every normalised answer form, so this is one lookup)
+- 'typo': it is within the edit distance of one of the item's own accepted
+  forms; this counts as correct
+- 'wrong': anything else
+The distance is only computed against the expected answer, with a banded
+Levenshtein that stops once the bound is exceeded, so the cost per answer does
+not depend on the catalog size.
+"""
+from collections import namedtuple
+
+UMLAUT_TABLE = str.maketrans({
+    'ä': 'ae', 'Ä': 'Ae',
+    'ö': 'oe', 'Ö': 'Oe',
+    'ü': 'ue', 'Ü': 'Ue',
+    'ß': 'ss',
+})
+
+CONJUGATIONS = ('ich', 'du', 'er_sie_es', 'wir', 'ihr', 'sie_Sie')
+
+EXACT = 'exact'
+SYNONYM = 'synonym'
+TYPO = 'typo'
+OTHER_WORD = 'other_word'
+WRONG = 'wrong'
+
+# One graded answer: user_answer as typed (stripped), correct_answer for display,
+# match one of EXACT/SYNONYM/TYPO/OTHER_WORD/WRONG, other_answer the entry typed instead (OTHER_WORD)
+Grade = namedtuple('Grade', ['is_correct', 'user_answer', 'correct_answer', 'match', 'other_answer'],
+                   defaults=(None,))
+
+class VerbGrade(namedtuple('VerbGrade', ['results', 'correct_count', 'all_correct'])):
+    """Grades of the six conjugations of a verb; results is {conjugation: Grade}"""
+    __slots__ = ()
+
+    def as_dict(self):
+        """{conjugation: {'correct', 'user_answer', 'correct_answer', 'match', 'other_answer'}} for the verb pages"""
+        return {
+            conj: {'correct': grade.is_correct, 'user_answer': grade.user_answer,
+                   'correct_answer': grade.correct_answer, 'match': grade.match,
+                   'other_answer': grade.other_answer}
+            for conj, grade in self.results.items()
+        }
+
+def normalize_umlauts(text):
+    """Convert umlauts to their ae/oe/ue/ss equivalents for flexible answer matching"""
+    if not text:
+        return text
+    return text.translate(UMLAUT_TABLE)
+
+def normalize_answer(text):
+    """Lower-cased, umlaut-free form of an answer, used for every comparison"""
+    if not text:
+        return ''
+    text = text.lower()
+    # Most answers are typed without umlauts; those need no translation
+    return text if text.isascii() else text.translate(UMLAUT_TABLE)
+
+def bounded_levenshtein(a, b, limit):
+    """Edit distance of a and b, or limit + 1 as soon as it is known to exceed limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) > len(b):
+        a, b = b, a
+    too_far = limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        # Only cells within limit of the diagonal can stay within limit
+        low = max(1, i - limit)
+        high = min(len(b), i + limit)
+        current = [too_far] * (len(b) + 1)
+        current[0] = i if i <= limit else too_far
+        for j in range(low, high + 1):
+            cost = 0 if char == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+        if min(current[low - 1:high + 1]) > limit:
+            return too_far
+        previous = current
+    return min(previous[len(b)], too_far)
+
+def typo_budget(key, typo_distance):
+    """Edits tolerated for key: none below 4 letters, at most one per 4 letters"""
+    return min(typo_distance, len(key) // 4)
+
+def classify(key, accepted_keys, typo_distance=0, known_forms=None):
+    """(match, other_answer) of a normalised answer that is not exact"""
+    if known_forms:
+        other = known_forms.get(key)
+        if other is not None:
+            return OTHER_WORD, other
+    if typo_distance:
+        for accepted in accepted_keys:
+            budget = typo_budget(accepted, typo_distance)
+            if budget and bounded_levenshtein(key, accepted, budget) <= budget:
+                return TYPO, None
+    return WRONG, None
+
+def _without_the(key):
+    return key[4:] if key.startswith('the ') else key
+
+def word_answer_keys(german, article):
+    """Normalised (noun, article + noun) of a word; both are accepted as answers"""
+    german_key = normalize_answer(german)
+    if not article:
+        return german_key, german_key
+    return german_key, normalize_answer(article + ' ' + german)
+
+class WordMatcher:
+    """Accepted answers of one word in both directions"""
+    __slots__ = ('german_keys', 'english_key', 'german_answer', 'english_answer')
+
+    def __init__(self, german, english, article):
+        self.german_keys = frozenset(word_answer_keys(german, article))
+        self.english_key = _without_the(normalize_answer(english))
+        self.german_answer = f"{article} {german}" if article else german
+        self.english_answer = english
+
+    def grade(self, answer, direction='en-de', typo_distance=0, known_forms=None, synonyms=None):
+        """
+        Grade answer; 'en-de' expects the German noun, 'de-en' the English
+        meaning or, with synonyms ({normalised gloss: German lemma keys}), any
+        gloss of the word. typo_distance and known_forms ({normalised form:
+        display form} of the whole catalog in that direction) enable near-miss
+        grading.
+        """
+        answer = (answer or '').strip()
+        key = normalize_answer(answer)
+        if direction == 'de-en':
+            key = _without_the(key)
+            accepted, correct_answer = (self.english_key,), self.english_answer
+        else:
+            accepted, correct_answer = self.german_keys, self.german_answer
+        if key in accepted:
+            return Grade(True, answer, correct_answer, EXACT)
+        if direction == 'de-en' and synonyms and not self.german_keys.isdisjoint(synonyms.get(key, ())):
+            return Grade(True, answer, correct_answer, SYNONYM)
+        match, other_answer = classify(key, accepted, typo_distance, known_forms)
+        return Grade(match == TYPO, answer, correct_answer, match, other_answer)
+
+class VerbMatcher:
+    """Accepted answers of the six conjugations of one verb"""
+    __slots__ = ('keys', 'forms')
+
+    def __init__(self, verb):
+        self.forms = {conj: getattr(verb, conj) for conj in CONJUGATIONS}
+        self.keys = {conj: normalize_answer(form) for conj, form in self.forms.items()}
+
+    def grade(self, answers, typo_distance=0, known_forms=None):
+        """
+        Grade answers, a mapping of conjugation -> answer (e.g. request.form).
+        typo_distance and known_forms ({normalised form: display form} of every
+        conjugation in the catalog) enable near-miss grading per conjugation.
+        """
+        results = {}
+        correct_count = 0
+        for conj in CONJUGATIONS:
+            answer = (answers.get(conj) or '').strip()
+            key = normalize_answer(answer)
+            if key == self.keys[conj]:
+                match, other_answer = EXACT, None
+            else:
+                match, other_answer = classify(key, (self.keys[conj],), typo_distance, known_forms)
+            is_correct = match in (EXACT, TYPO)
+            correct_count += is_correct
+            results[conj] = Grade(is_correct, answer, self.forms[conj], match, other_answer)
+        return VerbGrade(results, correct_count, correct_count == len(CONJUGATIONS))
+
+def grade_word(word, answer, direction='en-de', typo_distance=0, known_forms=None, synonyms=None):
+    """Grade an answer for a catalog word (see WordMatcher.grade)"""
+    return word.matcher.grade(answer, direction, typo_distance, known_forms, synonyms)
+
+def grade_verb(verb, answers, typo_distance=0, known_forms=None):
+    """Grade the conjugation answers for a catalog verb (see VerbMatcher.grade)"""
+    return verb.matcher.grade(answers, typo_distance, known_forms)
@@ -1,6 +1,7 @@
 import json
 from app import app, db
 from models import Word
+from catalog import bump_catalog_generation
 
 def extract_article(german_word):
     """Extract article from German word if present"""
@@ -66,6 +67,7 @@ def import_words():
             for i in range(0, len(new_words), batch_size):
                 batch = new_words[i:i+batch_size]
                 db.session.bulk_save_objects(batch)
+                bump_catalog_generation()
                 db.session.commit()
                 print(f"  Added batch {i//batch_size + 1}/{(len(new_words) + batch_size - 1)//batch_size}")
 
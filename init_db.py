@@ -1,5 +1,6 @@
 from app import app, db
 from models import User, Word, Verb, UserProgress
+from catalog import bump_catalog_generation
 
 def init_database():
     with app.app_context():
@@ -115,6 +116,7 @@ def init_database():
                 )
                 db.session.add(verb)
 
+            bump_catalog_generation()
             db.session.commit()
             print("Database initialized successfully!")
         else:
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the answer_event table (append-only log of answers)
+"""
+import sqlite3
+
+def migrate():
+    conn = sqlite3.connect('instance/learnGerman.db')
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='answer_event'")
+    if cursor.fetchone() is None:
+        print("Creating answer_event table...")
+        cursor.execute("""
+            CREATE TABLE answer_event (
+                id INTEGER NOT NULL PRIMARY KEY,
+                user_id INTEGER NOT NULL REFERENCES user (id),
+                word_id INTEGER REFERENCES word (id),
+                verb_id INTEGER REFERENCES verb (id),
+                mode VARCHAR(10) NOT NULL,
+                is_correct BOOLEAN,
+                created_at DATETIME NOT NULL,
+                applied BOOLEAN NOT NULL
+            )
+        """)
+        print("✓ Created answer_event")
+    else:
+        print("answer_event already exists")
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_answer_event_user_applied ON answer_event (user_id, applied)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_answer_event_applied ON answer_event (applied)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_answer_event_applied_created ON answer_event (applied, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_answer_event_user_word ON answer_event (user_id, word_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_answer_event_user_verb ON answer_event (user_id, verb_id)")
+    print("✓ Indexes on answer_event")
+
+    conn.commit()
+    conn.close()
+    print("\nMigration completed successfully!")
+    print("Note: progress recorded before this migration has no events; "
+          "compact_events.py --rebuild refuses to run while such progress exists.")
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the generation columns used by the offline catalog bundle and /catalog-sync
+"""
+import sqlite3
+
+def add_column(cursor, table, column, definition):
+    cursor.execute(f"PRAGMA table_info({table})")
+    columns = [row[1] for row in cursor.fetchall()]
+
+    if column not in columns:
+        print(f"Adding {column} column to {table}...")
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        print(f"✓ Added {column} to {table}")
+    else:
+        print(f"{column} already exists in {table}")
+
+def migrate():
+    conn = sqlite3.connect('instance/learnGerman.db')
+    cursor = conn.cursor()
+
+    add_column(cursor, 'word', 'generation', 'INTEGER')
+    add_column(cursor, 'verb', 'generation', 'INTEGER')
+    add_column(cursor, 'catalog_version', 'deleted_generation', 'INTEGER NOT NULL DEFAULT 0')
+
+    # Existing rows belong to the current generation
+    cursor.execute("SELECT generation FROM catalog_version WHERE id = 1")
+    row = cursor.fetchone()
+    generation = row[0] if row else 0
+    cursor.execute("UPDATE word SET generation = ? WHERE generation IS NULL", (generation,))
+    cursor.execute("UPDATE verb SET generation = ? WHERE generation IS NULL", (generation,))
+    print(f"✓ Existing words and verbs stamped with generation {generation}")
+
+    conn.commit()
+    conn.close()
+    print("\nMigration completed successfully!")
+
+if __name__ == '__main__':
+    migrate()
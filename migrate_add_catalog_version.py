@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the catalog_version table used to invalidate the in-memory vocabulary catalog
+"""
+import sqlite3
+
+def migrate():
+    conn = sqlite3.connect('instance/learnGerman.db')
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='catalog_version'")
+    if cursor.fetchone() is None:
+        print("Creating catalog_version table...")
+        cursor.execute("""
+            CREATE TABLE catalog_version (
+                id INTEGER NOT NULL PRIMARY KEY,
+                generation INTEGER NOT NULL
+            )
+        """)
+        print("✓ Created catalog_version")
+    else:
+        print("catalog_version already exists")
+
+    cursor.execute("INSERT OR IGNORE INTO catalog_version (id, generation) VALUES (1, 1)")
+
+    conn.commit()
+    conn.close()
+    print("\nMigration completed successfully!")
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the composite indexes used by the app's hot queries.
+Each index is created in its own short transaction, so the app only waits for
+one index build at a time and can keep running during the migration.
+"""
+import sqlite3
+
+INDEXES = [
+    ('ix_user_progress_user', 'user_progress', 'user_id'),
+    ('ix_test_result_user_mock_type_date', 'test_result', 'user_id, is_mock, test_type, date'),
+    ('ix_test_answer_test_correct', 'test_answer', 'test_id, is_correct'),
+    ('ix_activity_log_user_start', 'activity_log', 'user_id, start_time'),
+    ('ix_word_german_article', 'word', 'german, article'),
+    ('ix_verb_infinitive', 'verb', 'infinitive'),
+]
+
+def migrate():
+    # Wait for the app's writes to finish instead of failing with "database is locked"
+    conn = sqlite3.connect('instance/learnGerman.db', timeout=30)
+    cursor = conn.cursor()
+
+    for name, table, columns in INDEXES:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type='index' AND name=?", (name,))
+        if cursor.fetchone():
+            print(f"{name} already exists")
+            continue
+
+        print(f"Creating {name} on {table} ({columns})...")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+        conn.commit()
+        print(f"✓ Created {name}")
+
+    conn.close()
+    print("\nMigration completed successfully!")
+    print("Note: the unique progress indexes are added by migrate_add_progress_unique_index.py")
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Migration script to make (user_id, word_id) and (user_id, verb_id) unique in the progress tables.
+Duplicate rows are merged into the oldest one before the unique index is created.
+"""
+import sqlite3
+
+def merge_duplicates(cursor, table, item_column):
+    cursor.execute(f"""
+        SELECT user_id, {item_column}, MIN(id), COUNT(*)
+        FROM {table}
+        GROUP BY user_id, {item_column}
+        HAVING COUNT(*) > 1
+    """)
+    duplicates = cursor.fetchall()
+
+    for user_id, item_id, keep_id, count in duplicates:
+        # Sum the counters, keep the latest last_seen and the priority of the most recently seen row
+        cursor.execute(f"""
+            UPDATE {table} SET
+                times_seen = (SELECT SUM(COALESCE(times_seen, 0)) FROM {table} WHERE user_id = ? AND {item_column} = ?),
+                times_correct = (SELECT SUM(COALESCE(times_correct, 0)) FROM {table} WHERE user_id = ? AND {item_column} = ?),
+                times_incorrect = (SELECT SUM(COALESCE(times_incorrect, 0)) FROM {table} WHERE user_id = ? AND {item_column} = ?),
+                last_seen = (SELECT MAX(last_seen) FROM {table} WHERE user_id = ? AND {item_column} = ?),
+                priority_score = (SELECT priority_score FROM {table} WHERE user_id = ? AND {item_column} = ?
+                                  ORDER BY last_seen DESC, id DESC LIMIT 1)
+            WHERE id = ?
+        """, (user_id, item_id) * 5 + (keep_id,))
+        cursor.execute(f"DELETE FROM {table} WHERE user_id = ? AND {item_column} = ? AND id != ?",
+                       (user_id, item_id, keep_id))
+
+    return len(duplicates)
+
+def migrate():
+    conn = sqlite3.connect('instance/learnGerman.db')
+    cursor = conn.cursor()
+
+    for table, item_column, index_name in [
+        ('word_progress', 'word_id', 'uq_word_progress_user_word'),
+        ('verb_progress', 'verb_id', 'uq_verb_progress_user_verb'),
+    ]:
+        merged = merge_duplicates(cursor, table, item_column)
+        if merged:
+            print(f"✓ Merged {merged} duplicate {table} entries")
+
+        cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {index_name} ON {table} (user_id, {item_column})")
+        print(f"✓ {index_name} is in place")
+
+    conn.commit()
+    conn.close()
+    print("\nMigration completed successfully!")
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Migration script to add the test_session table that holds the state of tests in progress
+"""
+import sqlite3
+
+def migrate():
+    conn = sqlite3.connect('instance/learnGerman.db')
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='test_session'")
+    if cursor.fetchone() is None:
+        print("Creating test_session table...")
+        cursor.execute("""
+            CREATE TABLE test_session (
+                id VARCHAR(32) NOT NULL PRIMARY KEY,
+                user_id INTEGER NOT NULL REFERENCES user (id),
+                test_type VARCHAR(20) NOT NULL,
+                direction VARCHAR(10),
+                is_mock BOOLEAN,
+                questions TEXT NOT NULL,
+                current_question INTEGER,
+                score FLOAT,
+                answers TEXT NOT NULL,
+                expires_at DATETIME NOT NULL
+            )
+        """)
+        print("✓ Created test_session")
+    else:
+        print("test_session already exists")
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_test_session_user ON test_session (user_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_test_session_expires ON test_session (expires_at)")
+    print("✓ Indexes on test_session")
+
+    conn.commit()
+    conn.close()
+    print("\nMigration completed successfully!")
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Migration script to remove rows whose foreign key points to a deleted row
+(progress and test answers of words that older versions of cleanup_words.py deleted),
+so the app can enforce foreign keys (see db_profile.py)
+"""
+import sqlite3
+
+def migrate():
+    conn = sqlite3.connect('instance/learnGerman.db')
+    cursor = conn.cursor()
+
+    cursor.execute("PRAGMA foreign_key_check")
+    orphans = {}
+    for table, rowid, parent, _ in cursor.fetchall():
+        orphans.setdefault(table, set()).add(rowid)
+        print(f"  {table} row {rowid} references a missing {parent}")
+
+    if not orphans:
+        print("No rows with dangling foreign keys found")
+        conn.close()
+        return
+
+    cursor.execute("BEGIN")
+    for table, rowids in sorted(orphans.items()):
+        cursor.executemany(f"DELETE FROM {table} WHERE rowid = ?", [(rowid,) for rowid in rowids])
+        print(f"✓ Removed {len(rowids)} rows from {table}")
+
+    # Deleted progress rows may have counted as learned
+    cursor.execute("""
+        UPDATE user_progress SET
+            words_learned = (SELECT COUNT(*) FROM word_progress
+                             WHERE word_progress.user_id = user_progress.user_id AND times_correct > 0),
+            verbs_learned = (SELECT COUNT(*) FROM verb_progress
+                             WHERE verb_progress.user_id = user_progress.user_id AND times_correct > 0)
+    """)
+    print("✓ Recounted words_learned/verbs_learned")
+
+    conn.commit()
+    conn.close()
+    print("\nMigration completed successfully!")
+
+if __name__ == '__main__':
+    migrate()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Migration script to rebuild the test_answer table with ON DELETE CASCADE on test_id,
+so deleting a test_result also deletes its answers
+"""
+import sqlite3
+
+def migrate():
+    conn = sqlite3.connect('instance/learnGerman.db')
+    cursor = conn.cursor()
+
+    cursor.execute("PRAGMA foreign_key_list(test_answer)")
+    on_delete = {row[2]: row[6] for row in cursor.fetchall()}  # referenced table -> ON DELETE action
+    if on_delete.get('test_result') == 'CASCADE':
+        print("test_answer already cascades deletes from test_result")
+        conn.close()
+        return
+
+    # SQLite cannot change a foreign key in place, so the table is rebuilt
+    cursor.execute("PRAGMA foreign_keys=OFF")
+    cursor.execute("BEGIN")
+
+    cursor.execute("DELETE FROM test_answer WHERE test_id NOT IN (SELECT id FROM test_result)")
+    print(f"✓ Removed {cursor.rowcount} answers of tests that no longer exist")
+
+    print("Rebuilding test_answer...")
+    cursor.execute("""
+        CREATE TABLE test_answer_new (
+            id INTEGER NOT NULL PRIMARY KEY,
+            test_id INTEGER NOT NULL REFERENCES test_result (id) ON DELETE CASCADE,
+            word_id INTEGER REFERENCES word (id),
+            verb_id INTEGER REFERENCES verb (id),
+            user_answer VARCHAR(200),
+            correct_answer VARCHAR(200),
+            is_correct BOOLEAN
+        )
+    """)
+    cursor.execute("""
+        INSERT INTO test_answer_new (id, test_id, word_id, verb_id, user_answer, correct_answer, is_correct)
+        SELECT id, test_id, word_id, verb_id, user_answer, correct_answer, is_correct FROM test_answer
+    """)
+    cursor.execute("DROP TABLE test_answer")
+    cursor.execute("ALTER TABLE test_answer_new RENAME TO test_answer")
+    cursor.execute("CREATE INDEX ix_test_answer_test_correct ON test_answer (test_id, is_correct)")
+    print("✓ Rebuilt test_answer with ON DELETE CASCADE")
+
+    conn.commit()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    conn.close()
+    print("\nMigration completed successfully!")
+
+if __name__ == '__main__':
+    migrate()
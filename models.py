@@ -22,6 +22,11 @@ class Word(db.Model):
     english = db.Column(db.String(100), nullable=False)
     article = db.Column(db.String(10))  # der, die, das
     level = db.Column(db.String(10), default='A1')  # A1, A2, B1, B2, C1
+    generation = db.Column(db.Integer)  # Catalog generation that added the row; NULL until bump_catalog_generation()
+
+    __table_args__ = (
+        db.Index('ix_word_german_article', 'german', 'article'),
+    )
 
 class Verb(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -34,6 +39,11 @@ class Verb(db.Model):
     ihr = db.Column(db.String(100), nullable=False)
     sie_Sie = db.Column(db.String(100), nullable=False)
     level = db.Column(db.String(10), default='A1')  # A1, A2, B1, B2, C1
+    generation = db.Column(db.Integer)  # Catalog generation that added the row; NULL until bump_catalog_generation()
+
+    __table_args__ = (
+        db.Index('ix_verb_infinitive', 'infinitive'),
+    )
 
 class UserProgress(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -42,6 +52,10 @@ class UserProgress(db.Model):
     words_learned = db.Column(db.Integer, default=0)
     verbs_learned = db.Column(db.Integer, default=0)
 
+    __table_args__ = (
+        db.Index('ix_user_progress_user', 'user_id'),
+    )
+
 class WordProgress(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -52,6 +66,10 @@ class WordProgress(db.Model):
     last_seen = db.Column(db.DateTime, default=datetime.utcnow)
     priority_score = db.Column(db.Float, default=100.0)  # Higher = more likely to be shown
 
+    __table_args__ = (
+        db.Index('uq_word_progress_user_word', 'user_id', 'word_id', unique=True),
+    )
+
 class VerbProgress(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -62,6 +80,10 @@ class VerbProgress(db.Model):
     last_seen = db.Column(db.DateTime, default=datetime.utcnow)
     priority_score = db.Column(db.Float, default=100.0)  # Higher = more likely to be shown
 
+    __table_args__ = (
+        db.Index('uq_verb_progress_user_verb', 'user_id', 'verb_id', unique=True),
+    )
+
 class TestResult(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -72,21 +94,75 @@ class TestResult(db.Model):
     percentage = db.Column(db.Float, nullable=False)
     date = db.Column(db.DateTime, default=datetime.utcnow)
 
-    # For tracking individual answers
-    answers = db.relationship('TestAnswer', backref='test', lazy=True)
+    # For tracking individual answers (deleted by the database with the test)
+    answers = db.relationship('TestAnswer', backref='test', lazy=True, passive_deletes=True)
+
+    __table_args__ = (
+        db.Index('ix_test_result_user_mock_type_date', 'user_id', 'is_mock', 'test_type', 'date'),
+    )
 
 class TestAnswer(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    test_id = db.Column(db.Integer, db.ForeignKey('test_result.id'), nullable=False)
+    test_id = db.Column(db.Integer, db.ForeignKey('test_result.id', ondelete='CASCADE'), nullable=False)
     word_id = db.Column(db.Integer, db.ForeignKey('word.id'), nullable=True)
     verb_id = db.Column(db.Integer, db.ForeignKey('verb.id'), nullable=True)
     user_answer = db.Column(db.String(200))
     correct_answer = db.Column(db.String(200))
     is_correct = db.Column(db.Boolean)
 
+    __table_args__ = (
+        db.Index('ix_test_answer_test_correct', 'test_id', 'is_correct'),
+    )
+
+class TestSession(db.Model):
+    # State of a test in progress; the cookie only carries the id
+    id = db.Column(db.String(32), primary_key=True)  # Opaque random token
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    test_type = db.Column(db.String(20), nullable=False)  # 'vocabulary' or 'verb'
+    direction = db.Column(db.String(10))  # 'de-en' or 'en-de' (mock tests only)
+    is_mock = db.Column(db.Boolean, default=True)
+    questions = db.Column(db.Text, nullable=False)  # JSON list of word/verb ids
+    current_question = db.Column(db.Integer, default=0)
+    score = db.Column(db.Float, default=0)
+    answers = db.Column(db.Text, nullable=False, default='[]')  # JSON list of answer dicts
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_test_session_user', 'user_id'),
+        db.Index('ix_test_session_expires', 'expires_at'),
+    )
+
+class AnswerEvent(db.Model):
+    # Append-only log of answers and card views; progress rows are folded from it
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    word_id = db.Column(db.Integer, db.ForeignKey('word.id'), nullable=True)
+    verb_id = db.Column(db.Integer, db.ForeignKey('verb.id'), nullable=True)
+    mode = db.Column(db.String(10), nullable=False)  # 'practice', 'mock' or 'real'
+    is_correct = db.Column(db.Boolean)  # NULL for a card view without an answer
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    applied = db.Column(db.Boolean, nullable=False, default=False)  # Already in WordProgress/VerbProgress
+
+    __table_args__ = (
+        db.Index('ix_answer_event_user_applied', 'user_id', 'applied'),
+        db.Index('ix_answer_event_applied', 'applied'),
+        db.Index('ix_answer_event_applied_created', 'applied', 'created_at'),
+        db.Index('ix_answer_event_user_word', 'user_id', 'word_id'),
+        db.Index('ix_answer_event_user_verb', 'user_id', 'verb_id'),
+    )
+
 class ActivityLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     start_time = db.Column(db.DateTime, default=datetime.utcnow)
     end_time = db.Column(db.DateTime)
     duration_minutes = db.Column(db.Integer, default=0)
+
+    __table_args__ = (
+        db.Index('ix_activity_log_user_start', 'user_id', 'start_time'),
+    )
+
+class CatalogVersion(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)  # Bumped whenever Word/Verb rows change
+    deleted_generation = db.Column(db.Integer, nullable=False, default=0)  # Last generation that removed Word/Verb rows
@@ -0,0 +1,306 @@
+"""
+Word/verb progress bookkeeping.
+
+Every answer is applied with a single INSERT ... ON CONFLICT DO UPDATE, so
+counters and priority_score are changed by SQLite itself and two tabs or two
+workers answering at the same time cannot overwrite each other's update.
+Relies on the unique (user_id, word_id) / (user_id, verb_id) indexes.
+
+UserProgress.words_learned / verbs_learned count the items with at least one
+correct answer. They are kept up to date incrementally (+1 when an item's
+times_correct goes from 0 to 1); reconcile_learned_counts() recomputes them
+from the progress tables for auditing.
+
+record_answers() applies a whole finished test at once: the answers are
+folded into one ProgressDelta per item and written with a single executemany
+UPSERT ... RETURNING per kind (apply_progress_deltas(), which the write-behind
+buffer in progress_buffer.py uses as well).
+"""
+import math
+import sqlite3
+from datetime import datetime
+
+from sqlalchemy import bindparam, func, tuple_
+from sqlalchemy.dialects.sqlite import insert
+
+from models import db, UserProgress, WordProgress, VerbProgress
+
+PRIORITY_DEFAULT = 100.0
+PRIORITY_MIN = 1.0
+PRIORITY_MAX = 200.0
+CORRECT_FACTOR = 0.7    # Correct answer: show the item less often
+INCORRECT_FACTOR = 1.5  # Wrong answer: show the item more often
+
+# RETURNING is only available from SQLite 3.35 on
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+_PROGRESS = {
+    'word': (WordProgress, 'word_id'),
+    'verb': (VerbProgress, 'verb_id'),
+}
+
+_LEARNED_COLUMN = {
+    'word': UserProgress.words_learned,
+    'verb': UserProgress.verbs_learned,
+}
+
+def next_priority(score, is_correct):
+    """Priority after one answer (same formula as the SQL update)"""
+    score = score if score is not None else PRIORITY_DEFAULT
+    if is_correct:
+        return max(PRIORITY_MIN, score * CORRECT_FACTOR)
+    return min(PRIORITY_MAX, score * INCORRECT_FACTOR)
+
+def _upsert(kind, user_id, item_id, values, updates):
+    model, item_fk = _PROGRESS[kind]
+    stmt = insert(model).values(user_id=user_id, **{item_fk: item_id}, **values)
+    stmt = stmt.on_conflict_do_update(index_elements=['user_id', item_fk], set_=updates)
+    columns = (model.times_seen, model.times_correct, model.priority_score)
+
+    if _HAS_RETURNING:
+        return db.session.execute(stmt.returning(*columns)).one()
+    db.session.execute(stmt)
+    return db.session.execute(
+        db.select(*columns).filter_by(user_id=user_id, **{item_fk: item_id})
+    ).one()
+
+def record_answer(user_id, kind, item_id, is_correct):
+    """
+    Count one graded answer for a word or verb (kind is 'word' or 'verb').
+    Runs in the caller's transaction; returns the updated
+    (times_seen, times_correct, priority_score).
+    """
+    model, _ = _PROGRESS[kind]
+    now = datetime.utcnow()
+    current = func.coalesce(model.priority_score, PRIORITY_DEFAULT)
+    if is_correct:
+        new_priority = func.max(PRIORITY_MIN, current * CORRECT_FACTOR)
+    else:
+        new_priority = func.min(PRIORITY_MAX, current * INCORRECT_FACTOR)
+
+    row = _upsert(kind, user_id, item_id, {
+        'times_seen': 1,
+        'times_correct': 1 if is_correct else 0,
+        'times_incorrect': 0 if is_correct else 1,
+        'priority_score': next_priority(PRIORITY_DEFAULT, is_correct),
+        'last_seen': now,
+    }, {
+        'times_seen': model.times_seen + 1,
+        'times_correct': model.times_correct + (1 if is_correct else 0),
+        'times_incorrect': model.times_incorrect + (0 if is_correct else 1),
+        'priority_score': new_priority,
+        'last_seen': now,
+    })
+
+    # First correct answer for this item - it now counts as learned
+    if is_correct and row.times_correct == 1:
+        adjust_learned_count(user_id, kind, 1)
+    return row
+
+def adjust_learned_count(user_id, kind, delta, executor=None):
+    """Add delta to the user's words_learned or verbs_learned counter"""
+    column = _LEARNED_COLUMN[kind]
+    (executor if executor is not None else db.session).execute(
+        db.update(UserProgress)
+        .where(UserProgress.user_id == user_id)
+        .values({column: func.coalesce(column, 0) + delta})
+    )
+
+class ProgressDelta:
+    """
+    Combined effect of several answers (and views) of one item.
+
+    Every answer maps the priority through x -> max(MIN, 0.7x) or
+    x -> min(MAX, 1.5x). Any sequence of these is again of the form
+    x -> min(high, max(low, factor * x)), so the sequence collapses into
+    (factor, low, high) and can be applied in one UPDATE.
+    """
+
+    def __init__(self):
+        self.seen = 0
+        self.correct = 0
+        self.incorrect = 0
+        self.factor = 1.0
+        self.low = -math.inf
+        self.high = math.inf
+        self.last_seen = None
+
+    def add(self, is_correct, when=None):
+        self.seen += 1
+        self.last_seen = when or datetime.utcnow()
+        if is_correct:
+            self.correct += 1
+            # max(MIN, f * min(H, max(L, Mx))) = min(max(MIN, fH), max(max(MIN, fL), fMx))
+            self.factor *= CORRECT_FACTOR
+            self.low = max(PRIORITY_MIN, CORRECT_FACTOR * self.low)
+            self.high = max(PRIORITY_MIN, CORRECT_FACTOR * self.high)
+        else:
+            self.incorrect += 1
+            # min(MAX, f * min(H, max(L, Mx))) = min(min(MAX, fH), max(fL, fMx))
+            self.factor *= INCORRECT_FACTOR
+            self.low = INCORRECT_FACTOR * self.low
+            self.high = min(PRIORITY_MAX, INCORRECT_FACTOR * self.high)
+
+    def add_view(self, when=None):
+        """A card view without an answer: only times_seen changes"""
+        self.seen += 1
+        self.last_seen = when or datetime.utcnow()
+
+    def merge(self, later):
+        """Append the effect of a later delta of the same item to this one"""
+        # later(self(x)) = min(Hl, max(Ll, Ml * min(Hs, max(Ls, Ms x))))
+        #                = min(min(Hl, max(Ll, Ml Hs)), max(max(Ll, Ml Ls), Ml Ms x))
+        self.high = min(later.high, max(later.low, later.factor * self.high))
+        self.low = max(later.low, later.factor * self.low)
+        self.factor *= later.factor
+        self.seen += later.seen
+        self.correct += later.correct
+        self.incorrect += later.incorrect
+        self.last_seen = later.last_seen or self.last_seen
+        return self
+
+    def apply(self, score):
+        """Priority after all answers, starting from score"""
+        score = score if score is not None else PRIORITY_DEFAULT
+        return min(self.high, max(self.low, self.factor * score))
+
+def _upsert_deltas_statement(kind):
+    # executemany UPSERT that applies one ProgressDelta per row of parameters
+    model, item_fk = _PROGRESS[kind]
+    table = model.__table__
+    stmt = insert(table).values({
+        'user_id': bindparam('b_user_id'),
+        item_fk: bindparam('b_item_id'),
+        'times_seen': bindparam('b_seen'),
+        'times_correct': bindparam('b_correct'),
+        'times_incorrect': bindparam('b_incorrect'),
+        'priority_score': bindparam('b_new_priority'),
+        'last_seen': bindparam('b_last_seen'),
+    })
+    return stmt.on_conflict_do_update(index_elements=['user_id', item_fk], set_={
+        'times_seen': table.c.times_seen + stmt.excluded.times_seen,
+        'times_correct': table.c.times_correct + stmt.excluded.times_correct,
+        'times_incorrect': table.c.times_incorrect + stmt.excluded.times_incorrect,
+        'priority_score': func.min(bindparam('b_high'), func.max(
+            bindparam('b_low'),
+            bindparam('b_factor') * func.coalesce(table.c.priority_score, PRIORITY_DEFAULT))),
+        'last_seen': stmt.excluded.last_seen,
+    })
+
+def _returning_deltas_statement(kind):
+    model, item_fk = _PROGRESS[kind]
+    table = model.__table__
+    return _upsert_deltas_statement(kind).returning(
+        table.c.user_id, table.c[item_fk], table.c.times_correct, table.c.priority_score,
+        sort_by_parameter_order=True)
+
+def apply_progress_deltas(deltas, executor=None):
+    """
+    Write {(user_id, kind, item_id): ProgressDelta} with one executemany
+    UPSERT per kind. executor is db.session (the default, i.e. the caller's
+    transaction) or a Connection. Returns
+    {(user_id, kind, item_id): new priority_score}.
+
+    The learned counter and the new priorities come from the rows the UPSERT
+    wrote (RETURNING), not from a read before it: an item was newly learned
+    when its times_correct now equals the correct answers just added, i.e. it
+    was 0 before this statement, whatever other writers did in between.
+    """
+    executor = executor if executor is not None else db.session
+    by_kind = {}
+    for (user_id, kind, item_id), delta in deltas.items():
+        by_kind.setdefault(kind, {})[(user_id, item_id)] = delta
+
+    new_priorities = {}
+    for kind, item_deltas in by_kind.items():
+        model, item_fk = _PROGRESS[kind]
+        fk_column = getattr(model, item_fk)
+
+        rows = [{
+            'b_user_id': user_id,
+            'b_item_id': item_id,
+            'b_seen': delta.seen,
+            'b_correct': delta.correct,
+            'b_incorrect': delta.incorrect,
+            'b_new_priority': delta.apply(PRIORITY_DEFAULT),
+            'b_last_seen': delta.last_seen or datetime.utcnow(),
+            'b_factor': delta.factor,
+            'b_low': delta.low,
+            'b_high': delta.high,
+        } for (user_id, item_id), delta in item_deltas.items()]
+
+        if _HAS_RETURNING:
+            written = executor.execute(_returning_deltas_statement(kind), rows).all()
+        else:
+            # The UPSERT took the write lock, so nobody can change the rows before this read
+            executor.execute(_upsert_deltas_statement(kind), rows)
+            written = executor.execute(
+                db.select(model.user_id, fk_column, model.times_correct, model.priority_score)
+                .where(tuple_(model.user_id, fk_column).in_(list(item_deltas)))
+            ).all()
+
+        newly_learned = {}
+        for user_id, item_id, times_correct, priority_score in written:
+            delta = item_deltas[(user_id, item_id)]
+            if delta.correct and times_correct == delta.correct:
+                newly_learned[user_id] = newly_learned.get(user_id, 0) + 1
+            new_priorities[(user_id, kind, item_id)] = priority_score
+
+        for user_id, count in newly_learned.items():
+            adjust_learned_count(user_id, kind, count, executor)
+    return new_priorities
+
+def record_answers(user_id, answers):
+    """
+    Count the graded answers of a finished test in bulk.
+    answers is an iterable of (kind, item_id, is_correct), in answer order;
+    several answers to the same item are applied one after another, exactly
+    like repeated record_answer() calls. Runs in the caller's transaction with
+    one executemany UPSERT per kind, and returns
+    {(kind, item_id): new priority_score}.
+    """
+    now = datetime.utcnow()
+    deltas = {}
+    for kind, item_id, is_correct in answers:
+        deltas.setdefault((user_id, kind, item_id), ProgressDelta()).add(is_correct, now)
+
+    return {
+        (kind, item_id): priority
+        for (_, kind, item_id), priority in apply_progress_deltas(deltas).items()
+    }
+
+def record_view(user_id, kind, item_id):
+    """Count a card view without an answer (only times_seen and last_seen change)"""
+    model, _ = _PROGRESS[kind]
+    now = datetime.utcnow()
+    return _upsert(kind, user_id, item_id, {
+        'times_seen': 1,
+        'times_correct': 0,
+        'times_incorrect': 0,
+        'priority_score': PRIORITY_DEFAULT,
+        'last_seen': now,
+    }, {
+        'times_seen': model.times_seen + 1,
+        'last_seen': now,
+    })
+
+def reconcile_learned_counts():
+    """
+    Recompute words_learned/verbs_learned for every user from the progress tables.
+    Returns a list of (user_id, kind, stored, actual) for every counter that was wrong.
+    Runs in the caller's transaction.
+    """
+    corrections = []
+    for kind, (model, _) in _PROGRESS.items():
+        column = _LEARNED_COLUMN[kind]
+        actual = (
+            db.select(func.count())
+            .where(model.user_id == UserProgress.user_id, model.times_correct > 0)
+            .scalar_subquery()
+        )
+        for user_id, stored, count in db.session.execute(
+            db.select(UserProgress.user_id, column, actual).where(func.coalesce(column, -1) != actual)
+        ):
+            corrections.append((user_id, kind, stored, count))
+        db.session.execute(db.update(UserProgress).values({column: actual}))
+    return corrections
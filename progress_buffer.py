@@ -0,0 +1,255 @@
+"""
+Write path of practice and test progress, selected by PROGRESS_WRITE_MODE.
+
+- 'immediate' (default): record() and record_answers() update the progress
+  rows in the caller's transaction
+- 'buffered': practice answers and views are merged into a ProgressDelta per
+  (user, kind, item) in memory, and a background thread writes all pending
+  deltas in one transaction every PROGRESS_FLUSH_INTERVAL seconds, or sooner
+  once PROGRESS_FLUSH_MAX_PENDING items are waiting. The buffer is also
+  flushed at logout and at shutdown. Test answers are written with the test.
+- 'events': requests only append AnswerEvent rows and the background thread
+  folds them into the progress rows with compact_events() (answer_events.py)
+
+Every answer is logged as an AnswerEvent in all modes. Readers see pending
+changes: a new priority index overlays pending_priorities(), and routes that
+read progress from the database (the progress page, SQL card selection,
+tests) call flush(user_id) before their first query.
+"""
+import atexit
+import threading
+
+from catalog import catalog
+from models import db
+from progress import (_PROGRESS, ProgressDelta, apply_progress_deltas,
+                      record_answer, record_answers, record_view)
+from answer_events import (append_events, compact_events, event_row,
+                           pending_priorities as pending_event_priorities)
+
+PROGRESS_FLUSH_INTERVAL = 0.5
+PROGRESS_FLUSH_MAX_PENDING = 200
+
+class _Entry:
+    # base: priority_score in the database before the delta, delta: pending change,
+    # events: the AnswerEvent rows behind the delta
+    __slots__ = ('base', 'delta', 'events')
+
+    def __init__(self, base, delta):
+        self.base = base
+        self.delta = delta
+        self.events = []
+
+    def priority(self):
+        return self.delta.apply(self.base)
+
+class ProgressBuffer:
+    """Pending practice progress of every user, keyed by (user_id, kind, item_id)"""
+
+    def __init__(self, flush_interval=PROGRESS_FLUSH_INTERVAL, max_pending=PROGRESS_FLUSH_MAX_PENDING):
+        self.mode = 'immediate'
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.app = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._in_flight = {}
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def init_app(self, app):
+        """Read PROGRESS_WRITE_MODE, PROGRESS_FLUSH_INTERVAL and PROGRESS_FLUSH_MAX_PENDING from app.config"""
+        self.app = app
+        self.mode = app.config.get('PROGRESS_WRITE_MODE', 'immediate')
+        self.flush_interval = app.config.get('PROGRESS_FLUSH_INTERVAL', self.flush_interval)
+        self.max_pending = app.config.get('PROGRESS_FLUSH_MAX_PENDING', self.max_pending)
+        atexit.register(self.shutdown)
+
+    def _ensure_started(self):
+        if self._thread is None and self.app is not None:
+            self._thread = threading.Thread(target=self._run, name='progress-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception:
+                # Deltas go back into the buffer and events stay pending; both are retried
+                self.app.logger.exception("Progress flush failed")
+
+    def _base_priority(self, key):
+        # The priority the item will have once everything before this answer is written
+        with self._lock:
+            entry = self._in_flight.get(key)
+            if entry is not None:
+                return True, entry.priority()
+        user_id, kind, item_id = key
+        model, item_fk = _PROGRESS[kind]
+        row = db.session.execute(
+            db.select(model.priority_score).filter_by(user_id=user_id, **{item_fk: item_id})
+        ).first()
+        return False, (row.priority_score if row else None)
+
+    def record(self, user_id, kind, item_id, is_correct=None):
+        """
+        Count a practice answer (is_correct True/False) or a card view
+        (is_correct None) and return the item's new priority_score.
+        Immediate mode writes in the caller's transaction, events mode only
+        appends the event there, and buffered mode only queues the change.
+        """
+        event = event_row(user_id, kind, item_id, 'practice', is_correct)
+        if self.mode == 'events':
+            append_events([event])
+            self._ensure_started()
+            return pending_event_priorities(user_id, kind, [item_id])[item_id]
+        if self.mode != 'buffered':
+            append_events([event], applied=True)
+            if is_correct is None:
+                return record_view(user_id, kind, item_id).priority_score
+            return record_answer(user_id, kind, item_id, is_correct).priority_score
+
+        key = (user_id, kind, item_id)
+        with self._lock:
+            entry = self._pending.get(key)
+        if entry is None:
+            _, base = self._base_priority(key)
+
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                entry = self._pending[key] = _Entry(base, ProgressDelta())
+            if is_correct is None:
+                entry.delta.add_view(event['created_at'])
+            else:
+                entry.delta.add(is_correct, event['created_at'])
+            entry.events.append(event)
+            priority = entry.priority()
+            if len(self._pending) >= self.max_pending:
+                self._wakeup.set()
+        self._ensure_started()
+        return priority
+
+    def record_answers(self, user_id, answers, mode):
+        """
+        Count the graded answers of a mock or real test, given as
+        (kind, item_id, is_correct) in answer order, and return
+        {(kind, item_id): new priority_score}. Only events mode defers the
+        progress update; buffered mode writes test answers in the caller's
+        transaction too, so the user's buffer must have been flushed first.
+        """
+        events = [event_row(user_id, kind, item_id, mode, is_correct)
+                  for kind, item_id, is_correct in answers]
+        if self.mode != 'events':
+            append_events(events, applied=True)
+            return record_answers(user_id, answers)
+
+        append_events(events)
+        self._ensure_started()
+        new_priorities = {}
+        for kind in {kind for kind, _, _ in answers}:
+            item_ids = {item_id for kind_, item_id, _ in answers if kind_ == kind}
+            for item_id, priority in pending_event_priorities(user_id, kind, item_ids).items():
+                new_priorities[(kind, item_id)] = priority
+        return new_priorities
+
+    def record_practice(self, user_id, answers):
+        """
+        Count a batch of graded practice answers, (kind, item_id, is_correct)
+        in answer order, and return {(kind, item_id): new priority_score}.
+        Buffered mode queues each one like record(); the other modes write the
+        batch like record_answers(), with one statement per kind.
+        """
+        if self.mode != 'buffered':
+            return self.record_answers(user_id, answers, 'practice')
+        return {(kind, item_id): self.record(user_id, kind, item_id, is_correct)
+                for kind, item_id, is_correct in answers}
+
+    def pending_priorities(self, user_id, kind):
+        """{item_id: priority} of the user's items whose changes are not written yet"""
+        if self.mode == 'events':
+            return pending_event_priorities(user_id, kind)
+        with self._lock:
+            return {
+                item_id: entry.priority()
+                for source in (self._in_flight, self._pending)
+                for (uid, kind_, item_id), entry in source.items()
+                if uid == user_id and kind_ == kind
+            }
+
+    def discard(self, user_id):
+        """
+        Forget the user's pending changes because their progress is being
+        cleared. Changes that a flush is writing right now are dropped from
+        the in-flight set (so a failed write does not put them back), and the
+        call waits for that write to finish: call it before deleting the
+        progress rows, so the delete also removes what the flush wrote.
+        """
+        with self._lock:
+            for source in (self._pending, self._in_flight):
+                for key in [key for key in source if key[0] == user_id]:
+                    del source[key]
+        with self._flush_lock:
+            pass
+
+    def flush(self, user_id=None):
+        """
+        Write the pending changes (all, or only user_id's) on a connection of
+        its own, so it never joins the caller's transaction: the buffered
+        deltas in one transaction, or the pending events through
+        compact_events(). Needs an app context; returns the number of items
+        (or events) written.
+        """
+        if self.mode == 'events':
+            return compact_events(None if user_id is None else [user_id])
+        if self.mode != 'buffered':
+            return 0
+        with self._flush_lock:
+            with self._lock:
+                keys = [key for key in self._pending if user_id is None or key[0] == user_id]
+                if not keys:
+                    return 0
+                for key in keys:
+                    self._in_flight[key] = self._pending.pop(key)
+                in_flight = dict(self._in_flight)
+
+            # Items removed from the catalog in the meantime cannot be written
+            entries = {
+                key: entry for key, entry in in_flight.items()
+                if (catalog.word(key[2]) if key[1] == 'word' else catalog.verb(key[2])) is not None
+            }
+            deltas = {key: entry.delta for key, entry in entries.items()}
+            events = [event for entry in entries.values() for event in entry.events]
+            try:
+                with db.engine.begin() as connection:
+                    apply_progress_deltas(deltas, connection)
+                    append_events(events, applied=True, executor=connection)
+            except Exception:
+                # Put the changes back in front of anything recorded meanwhile
+                with self._lock:
+                    for key, entry in self._in_flight.items():
+                        later = self._pending.get(key)
+                        if later is not None:
+                            entry.delta.merge(later.delta)
+                            entry.events.extend(later.events)
+                        self._pending[key] = entry
+                    self._in_flight = {}
+                raise
+            with self._lock:
+                self._in_flight = {}
+            return len(deltas)
+
+    def shutdown(self):
+        """Write everything that is still pending"""
+        if self.app is None or self.mode == 'immediate':
+            return
+        try:
+            with self.app.app_context():
+                self.flush()
+        except Exception:
+            self.app.logger.exception("Progress flush at shutdown failed")
+
+progress_buffer = ProgressBuffer()
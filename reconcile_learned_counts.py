@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Script to recompute every user's words_learned/verbs_learned counters from the progress tables
+"""
+from app import app, db
+from progress import reconcile_learned_counts
+
+def reconcile():
+    with app.app_context():
+        corrections = reconcile_learned_counts()
+        db.session.commit()
+
+        if not corrections:
+            print("✓ All learned counters were already correct")
+            return
+
+        for user_id, kind, stored, actual in corrections:
+            print(f"  user {user_id}: {kind}s_learned {stored} -> {actual}")
+        print(f"\n✓ Fixed {len(corrections)} counters")
+
+if __name__ == '__main__':
+    reconcile()
@@ -0,0 +1,155 @@
+"""
+Test history retention.
+
+Only the newest TEST_RETENTION_COUNT tests per (user, test type, mock/real)
+are kept. cycle_old_tests() removes the rest with a single DELETE that ranks
+the tests with ROW_NUMBER(); their answers go with them through the
+ON DELETE CASCADE of test_answer.test_id.
+
+With TEST_RETENTION_MODE = 'background' a finished test only queues its user,
+and a background thread trims the queued users every RETENTION_INTERVAL
+seconds, so the delete never runs on the request path.
+
+purge_user_history() is the reset behind the clear-* endpoints: a fixed
+number of DELETEs by subquery, whatever the size of the user's history.
+"""
+import threading
+import time
+
+from sqlalchemy import func
+
+from models import (db, TestResult, TestAnswer, WordProgress, VerbProgress,
+                    UserProgress, ActivityLog, AnswerEvent)
+from grade_cache import overall_grades
+
+TEST_RETENTION_COUNT = 10
+RETENTION_INTERVAL = 60
+
+def retention_delete_statement(user_ids=None, keep=TEST_RETENTION_COUNT):
+    """DELETE of every test beyond the newest keep per user, test type and mock status"""
+    ranked = db.select(
+        TestResult.id,
+        func.row_number().over(
+            partition_by=(TestResult.user_id, TestResult.test_type, TestResult.is_mock),
+            order_by=(TestResult.date.desc(), TestResult.id.desc())
+        ).label('position')
+    )
+    if user_ids is not None:
+        ranked = ranked.where(TestResult.user_id.in_(list(user_ids)))
+    ranked = ranked.subquery()
+
+    return (
+        db.delete(TestResult)
+        .where(TestResult.id.in_(db.select(ranked.c.id).where(ranked.c.position > keep)))
+        .execution_options(synchronize_session=False)
+    )
+
+def cycle_old_tests(user_ids=None, keep=TEST_RETENTION_COUNT):
+    """
+    Delete every test beyond the newest keep per user, test type and mock status.
+    user_ids limits the sweep to some users (None = everyone). Runs in the
+    caller's transaction and returns the number of deleted tests.
+    """
+    deleted = db.session.execute(retention_delete_statement(user_ids, keep)).rowcount
+    if deleted:
+        overall_grades.invalidate(user_ids)
+    return deleted
+
+def purge_user_history(user_id, mock_tests=False, real_tests=False, progress=False):
+    """
+    Delete part of a user's history in a fixed number of statements.
+
+    mock_tests / real_tests delete those test results and their answers;
+    progress deletes word/verb progress, the answer log and activity logs and
+    resets the UserProgress counters. Runs in the caller's transaction and returns
+    {table name: number of rows deleted}.
+    """
+    deleted = {}
+    if mock_tests or real_tests:
+        tests = db.select(TestResult.id).where(TestResult.user_id == user_id)
+        if not (mock_tests and real_tests):
+            tests = tests.where(TestResult.is_mock == mock_tests)
+        # Answers are removed explicitly so the count is reported (and older
+        # databases without ON DELETE CASCADE are cleaned up as well)
+        deleted['test_answer'] = db.session.execute(
+            db.delete(TestAnswer).where(TestAnswer.test_id.in_(tests))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        deleted['test_result'] = db.session.execute(
+            db.delete(TestResult).where(TestResult.id.in_(tests))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if real_tests:
+            overall_grades.invalidate([user_id])
+
+    if progress:
+        for model in (AnswerEvent, WordProgress, VerbProgress, ActivityLog):
+            deleted[model.__tablename__] = db.session.execute(
+                db.delete(model).where(model.user_id == user_id)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+        db.session.execute(
+            db.update(UserProgress).where(UserProgress.user_id == user_id)
+            .values(words_learned=0, verbs_learned=0, total_time_minutes=0)
+            .execution_options(synchronize_session=False)
+        )
+    return deleted
+
+class TestRetention:
+    """Runs cycle_old_tests() after finished tests, inline or from a background thread"""
+
+    def __init__(self, keep=TEST_RETENTION_COUNT, background=False, interval=RETENTION_INTERVAL):
+        self.keep = keep
+        self.background = background
+        self.interval = interval
+        self.app = None
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._thread = None
+
+    def init_app(self, app):
+        """Read TEST_RETENTION_COUNT and TEST_RETENTION_MODE ('inline' or 'background') from app.config"""
+        self.app = app
+        self.keep = app.config.get('TEST_RETENTION_COUNT', self.keep)
+        self.background = app.config.get('TEST_RETENTION_MODE', 'inline') == 'background'
+
+    def test_finished(self, user_id):
+        """
+        Called by test_complete before it commits. Inline mode trims the user's
+        history in the caller's transaction; background mode only queues the user.
+        """
+        if not self.background:
+            cycle_old_tests([user_id], self.keep)
+            return
+        with self._lock:
+            self._pending.add(user_id)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='test-retention', daemon=True)
+                self._thread.start()
+
+    def run_pending(self):
+        """Trim the history of every queued user in one transaction (needs an app context)"""
+        with self._lock:
+            user_ids, self._pending = self._pending, set()
+        if not user_ids:
+            return 0
+        try:
+            deleted = cycle_old_tests(user_ids, self.keep)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            with self._lock:
+                self._pending |= user_ids
+            raise
+        return deleted
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                with self.app.app_context():
+                    self.run_pending()
+            except Exception:
+                self.app.logger.exception("Test retention failed")
+
+test_retention = TestRetention()
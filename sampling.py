@@ -0,0 +1,117 @@
+"""
+Weighted random sampling used to pick cards and test questions.
+
+WeightedIndex keeps the weights in a Fenwick tree so a long-lived pool (e.g.
+one user's progress) can be updated and sampled in O(log n) per item instead
+of rebuilding the weight list. sample() gives the same distribution as
+repeatedly calling random.choices() and removing the chosen item.
+"""
+import random
+
+class WeightedIndex:
+    """
+    Fenwick tree over a list of slots, each holding a weight.
+    Slots with weight 0 are never picked.
+    """
+
+    def __init__(self, weights=()):
+        self._weights = [float(w) if w and w > 0 else 0.0 for w in weights]
+        self._rebuild()
+
+    def _rebuild(self):
+        size = len(self._weights)
+        tree = [0.0] * (size + 1)
+        for i, weight in enumerate(self._weights, 1):
+            tree[i] += weight
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._top_bit = 1 << (size.bit_length() - 1) if size else 0
+
+    def __len__(self):
+        return len(self._weights)
+
+    def weight(self, slot):
+        return self._weights[slot]
+
+    def _prefix(self, i):
+        # Sum of the first i weights
+        total = 0.0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def total(self):
+        """Sum of all weights (O(log n))"""
+        return self._prefix(len(self._weights))
+
+    def append(self, weight=0.0):
+        """Add a new slot at the end and return its position"""
+        self._weights.append(0.0)
+        size = len(self._weights)
+        self._tree.append(self._prefix(size - 1) - self._prefix(size - (size & -size)))
+        if size & (size - 1) == 0:
+            self._top_bit = size
+        slot = size - 1
+        self.update(slot, weight)
+        return slot
+
+    def update(self, slot, weight):
+        """Set the weight of one slot"""
+        weight = float(weight) if weight and weight > 0 else 0.0
+        delta = weight - self._weights[slot]
+        if delta == 0.0:
+            return
+        self._weights[slot] = weight
+        i = slot + 1
+        size = len(self._weights)
+        while i <= size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def _find(self, target):
+        # Smallest slot whose prefix sum exceeds target
+        pos = 0
+        bit = self._top_bit
+        size = len(self._weights)
+        while bit:
+            nxt = pos + bit
+            if nxt <= size and self._tree[nxt] <= target:
+                pos = nxt
+                target -= self._tree[nxt]
+            bit >>= 1
+        return pos
+
+    def choice(self, rng=None):
+        """Pick one slot proportionally to its weight, or None if all weights are 0"""
+        rng = rng or random
+        for _ in range(2):
+            total = self.total()
+            if total <= 0:
+                return None
+            slot = self._find(rng.random() * total)
+            if slot < len(self._weights) and self._weights[slot] > 0:
+                return slot
+            # Floating point drift after many updates - rebuild from the exact weights and retry
+            self._rebuild()
+        return None
+
+    def sample(self, k, rng=None):
+        """Pick up to k distinct slots without replacement"""
+        chosen = []
+        removed = []
+        try:
+            for _ in range(k):
+                slot = self.choice(rng)
+                if slot is None:
+                    break
+                chosen.append(slot)
+                removed.append((slot, self._weights[slot]))
+                self.update(slot, 0.0)
+        finally:
+            # Put the weights back so the index is unchanged for the next caller
+            for slot, weight in removed:
+                self.update(slot, weight)
+        return chosen
@@ -0,0 +1,306 @@
+"""
+Per-user card selection.
+
+Each (user, kind) pair gets a PriorityIndex built from the catalog and the
+user's progress rows the first time it is needed. Routes that change a
+priority_score call priority_indexes.update() afterwards so the index stays current
+without rescanning the progress table. Picking the next card or a set of test
+questions is then O(log n) instead of a pass over the whole catalog.
+
+pick_card_sql() is the alternative for CARD_SELECTION_MODE = 'sql': SQLite
+does the unseen/seen split and the weighted draw, and only the chosen row is
+loaded, so memory per request does not grow with the catalog.
+"""
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import bindparam, text
+
+from models import db, Word, Verb, WordProgress, VerbProgress
+from catalog import catalog
+from progress_buffer import progress_buffer
+from sampling import WeightedIndex
+
+DEFAULT_PRIORITY = 100.0
+
+# Chance of picking an unseen item while there are still unseen items left
+UNSEEN_PROBABILITY = 0.9
+
+class ItemSlots:
+    """
+    Slot numbering of the items of one catalog generation (item id <-> slot).
+    It only depends on the catalog, so every user's PriorityIndex shares it.
+    """
+    __slots__ = ('item_ids', 'slots')
+
+    def __init__(self, item_ids):
+        self.item_ids = tuple(item_ids)
+        self.slots = {item_id: slot for slot, item_id in enumerate(self.item_ids)}
+
+class PriorityIndex:
+    """
+    Selection state for one user and one kind of item.
+
+    Seen items are weighted by their priority_score; unseen items are kept in
+    a swap-remove list so a uniform pick and a removal are both O(1). Only the
+    weights and the unseen list are per user; items (an ItemSlots, or a list of
+    item ids) can be shared.
+    """
+
+    def __init__(self, items, priorities, generation=None):
+        self.generation = generation
+        self.built_at = time.monotonic()
+        # pick() and sample() temporarily change weights, so all access is serialised
+        self._lock = threading.Lock()
+        if not isinstance(items, ItemSlots):
+            items = ItemSlots(items)
+        self._slots = items.slots
+        self._item_ids = items.item_ids
+
+        # Review weights: priority for seen items, 0 for unseen ones
+        self._seen = WeightedIndex(
+            self._priority(priorities[item_id]) if item_id in priorities else 0.0
+            for item_id in self._item_ids
+        )
+        # Test weights: like the review weights, but unseen items count as DEFAULT_PRIORITY
+        self._all = WeightedIndex(
+            self._priority(priorities[item_id]) if item_id in priorities else DEFAULT_PRIORITY
+            for item_id in self._item_ids
+        )
+        self._unseen = [item_id for item_id in self._item_ids if item_id not in priorities]
+        self._unseen_pos = {item_id: pos for pos, item_id in enumerate(self._unseen)}
+
+    @staticmethod
+    def _priority(score):
+        return score if score is not None else DEFAULT_PRIORITY
+
+    def __len__(self):
+        return len(self._item_ids)
+
+    def is_seen(self, item_id):
+        return item_id in self._slots and item_id not in self._unseen_pos
+
+    def update(self, item_id, priority):
+        """Record a new priority_score for an item (marks it as seen)"""
+        slot = self._slots.get(item_id)
+        if slot is None:
+            return
+        with self._lock:
+            pos = self._unseen_pos.pop(item_id, None)
+            if pos is not None:
+                last = self._unseen.pop()
+                if last != item_id:
+                    self._unseen[pos] = last
+                    self._unseen_pos[last] = pos
+            priority = self._priority(priority)
+            self._seen.update(slot, priority)
+            self._all.update(slot, priority)
+
+    def _pick_unseen(self, recent, rng):
+        blocked = sum(1 for item_id in recent if item_id in self._unseen_pos)
+        if blocked >= len(self._unseen):
+            return None
+        if len(self._unseen) <= 2 * blocked:
+            return rng.choice([item_id for item_id in self._unseen if item_id not in recent])
+        # Most unseen items are allowed, so rejection sampling finishes quickly
+        while True:
+            item_id = rng.choice(self._unseen)
+            if item_id not in recent:
+                return item_id
+
+    def _pick_seen(self, recent, rng):
+        # Hide recently shown items for the duration of the draw
+        hidden = []
+        for item_id in recent:
+            slot = self._slots.get(item_id)
+            if slot is not None and self._seen.weight(slot) > 0:
+                hidden.append((slot, self._seen.weight(slot)))
+                self._seen.update(slot, 0.0)
+        try:
+            slot = self._seen.choice(rng)
+        finally:
+            for slot_, weight in hidden:
+                self._seen.update(slot_, weight)
+        return self._item_ids[slot] if slot is not None else None
+
+    def pick(self, recent=(), rng=None):
+        """
+        Choose the next card, skipping items in recent.
+        Unseen items come first (90% of the time), otherwise seen items are
+        drawn weighted by priority. Returns (item_id, history_cleared); when
+        every item was shown recently the history is ignored and
+        history_cleared is True.
+        """
+        rng = rng or random
+        recent = set(recent)
+
+        with self._lock:
+            if rng.random() < UNSEEN_PROBABILITY:
+                item_id = self._pick_unseen(recent, rng)
+                if item_id is None:
+                    item_id = self._pick_seen(recent, rng)
+            else:
+                item_id = self._pick_seen(recent, rng)
+                if item_id is None:
+                    item_id = self._pick_unseen(recent, rng)
+            if item_id is not None:
+                return item_id, False
+
+            if not self._item_ids or not recent:
+                return None, False
+            slot = self._all.choice(rng)
+            return (self._item_ids[slot] if slot is not None else None), True
+
+    def sample(self, k, rng=None):
+        """Pick k distinct items for a test, weighted by priority (unseen = 100)"""
+        with self._lock:
+            return [self._item_ids[slot] for slot in self._all.sample(k, rng)]
+
+class PriorityIndexCache:
+    """
+    Keeps the PriorityIndex of recently active users in memory.
+    Indexes are rebuilt when the catalog changes or after max_age seconds,
+    which bounds drift when another process updates the same user.
+    """
+
+    def __init__(self, max_users=256, max_age=300):
+        self.max_users = max_users
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._indexes = OrderedDict()
+        # kind -> (catalog generation, ItemSlots) shared by the indexes of that generation
+        self._item_slots = {}
+
+    def _shared_slots(self, kind, items):
+        generation, slots = self._item_slots.get(kind, (None, None))
+        if slots is None or generation != catalog.generation:
+            slots = ItemSlots(item.id for item in items)
+            self._item_slots[kind] = (catalog.generation, slots)
+        return slots
+
+    def _build(self, user_id, kind):
+        if kind == 'word':
+            items = catalog.words()
+            rows = db.session.execute(
+                db.select(WordProgress.word_id, WordProgress.priority_score)
+                .filter_by(user_id=user_id)
+            )
+        else:
+            items = catalog.verbs()
+            rows = db.session.execute(
+                db.select(VerbProgress.verb_id, VerbProgress.priority_score)
+                .filter_by(user_id=user_id)
+            )
+        priorities = dict(rows.all())
+        # Answers still waiting in the write-behind buffer
+        priorities.update(progress_buffer.pending_priorities(user_id, kind))
+        return PriorityIndex(self._shared_slots(kind, items), priorities,
+                             generation=catalog.generation)
+
+    def get(self, user_id, kind):
+        """Return the index for user_id and kind ('word' or 'verb'), building it if needed"""
+        key = (user_id, kind)
+        # Touching the catalog first makes sure its generation is current
+        if kind == 'word':
+            catalog.words()
+        else:
+            catalog.verbs()
+        with self._lock:
+            index = self._indexes.get(key)
+            if (index is None or index.generation != catalog.generation
+                    or time.monotonic() - index.built_at > self.max_age):
+                index = self._build(user_id, kind)
+                self._indexes[key] = index
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+            return index
+
+    def update(self, user_id, kind, item_id, priority):
+        """Apply a changed priority_score to an index that is already loaded"""
+        with self._lock:
+            index = self._indexes.get((user_id, kind))
+            if index is not None:
+                index.update(item_id, priority)
+
+    def drop(self, user_id):
+        """Forget every index of a user (e.g. after their progress was cleared)"""
+        with self._lock:
+            for key in [key for key in self._indexes if key[0] == user_id]:
+                del self._indexes[key]
+
+priority_indexes = PriorityIndexCache()
+
+# Table names per kind: (item table, progress table, progress foreign key, model)
+_SQL_TABLES = {
+    'word': ('word', 'word_progress', 'word_id', Word),
+    'verb': ('verb', 'verb_progress', 'verb_id', Verb),
+}
+
+def _sql_pick_statement(kind, mode):
+    """
+    Build the selection query for one kind and mode.
+    mode is 'unseen' (uniform over unseen items), 'seen' (weighted by
+    priority) or 'any' (weighted, unseen items count as DEFAULT_PRIORITY).
+    Candidates are numbered with window functions and the row at fraction :r
+    of the cumulative weight is returned, so :r fully determines the pick.
+    """
+    items, progress, item_fk, _ = _SQL_TABLES[kind]
+    if mode == 'unseen':
+        candidates = f"""
+            SELECT i.id AS item_id,
+                   ROW_NUMBER() OVER (ORDER BY i.id) AS running,
+                   COUNT(*) OVER () AS total
+            FROM {items} i
+            LEFT JOIN {progress} p ON p.{item_fk} = i.id AND p.user_id = :user_id
+            WHERE p.id IS NULL AND i.id NOT IN :recent
+        """
+        chosen = "SELECT item_id FROM candidates WHERE running = CAST(:r * total AS INTEGER) + 1"
+    else:
+        join = "JOIN" if mode == 'seen' else "LEFT JOIN"
+        candidates = f"""
+            SELECT i.id AS item_id,
+                   SUM(COALESCE(p.priority_score, {DEFAULT_PRIORITY})) OVER (ORDER BY i.id) AS running,
+                   SUM(COALESCE(p.priority_score, {DEFAULT_PRIORITY})) OVER () AS total
+            FROM {items} i
+            {join} {progress} p ON p.{item_fk} = i.id AND p.user_id = :user_id
+            WHERE i.id NOT IN :recent
+        """
+        chosen = "SELECT item_id FROM candidates WHERE running > :r * total ORDER BY running LIMIT 1"
+
+    return text(f"""
+        WITH candidates AS ({candidates})
+        SELECT * FROM {items} WHERE id = ({chosen})
+    """).bindparams(bindparam('recent', expanding=True))
+
+def _sql_pick(kind, user_id, recent, r, mode):
+    """Run one selection query and return the chosen row (or None)"""
+    model = _SQL_TABLES[kind][3]
+    return db.session.scalars(
+        db.select(model).from_statement(_sql_pick_statement(kind, mode)),
+        {'user_id': user_id, 'recent': list(recent), 'r': r}
+    ).first()
+
+def pick_card_sql(user_id, kind, recent=(), rng=None):
+    """
+    Same policy as PriorityIndex.pick(), evaluated inside SQLite.
+    Returns (Word or Verb, history_cleared).
+    """
+    rng = rng or random
+    recent = list(recent)
+
+    if rng.random() < UNSEEN_PROBABILITY:
+        order = ('unseen', 'seen')
+    else:
+        order = ('seen', 'unseen')
+    for mode in order:
+        row = _sql_pick(kind, user_id, recent, rng.random(), mode)
+        if row is not None:
+            return row, False
+
+    if not recent:
+        return None, False
+    # Everything was shown recently - ignore the history
+    return _sql_pick(kind, user_id, [], rng.random(), 'any'), True
@@ -0,0 +1,128 @@
+"""
+English synonyms for German -> English grading.
+
+english_german.json and german_english.json list many more English glosses
+than the one meaning stored on each Word ("rubbish" and "waste" for Abfall).
+SynonymIndex folds both files and the catalog into one dict, normalised English
+gloss -> frozenset of normalised German lemmas, so grading a de-en answer is a
+single lookup (see WordMatcher.grade).
+
+Glosses are normalised like answers (grading.normalize_answer, without "the"),
+notes in parentheses are dropped ("leave (irr.)" -> "leave") and
+comma-separated alternatives ("pullover, sweater") become separate glosses.
+Only lemmas of catalog words are kept, matched case-sensitively so the verb
+"leben" does not lend its glosses to the noun "Leben". The index is rebuilt
+when either file changes on disk or the catalog reloads after a change to the
+Word table.
+"""
+import json
+import os
+import re
+import threading
+import time
+
+from catalog import catalog
+from grading import normalize_answer, normalize_umlauts, _without_the
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DICTIONARY_FILES = (os.path.join(BASE_DIR, 'english_german.json'),
+                    os.path.join(BASE_DIR, 'german_english.json'))
+
+_NOTE = re.compile(r'\([^)]*\)')
+
+def dictionary_entries(text):
+    """Entries of one dictionary side: notes dropped, alternatives split, spaces collapsed"""
+    entries = []
+    for part in _NOTE.sub(' ', text).split(','):
+        entry = ' '.join(part.split())
+        if entry:
+            entries.append(entry)
+    return entries
+
+def gloss_keys(english):
+    """Normalised English glosses, as compared with de-en answers"""
+    return [_without_the(normalize_answer(entry)) for entry in dictionary_entries(english)]
+
+def build_synonym_index(pairs, lemmas):
+    """
+    {gloss key: frozenset of lemma keys} of (english, german) pairs; lemmas maps
+    the umlaut-free, case-preserved German forms to keep to their answer keys
+    """
+    index = {}
+    for english, german in pairs:
+        matched = [lemmas[form] for form in map(normalize_umlauts, dictionary_entries(german)) if form in lemmas]
+        if not matched:
+            continue
+        for gloss in gloss_keys(english):
+            index.setdefault(gloss, set()).update(matched)
+    return {gloss: frozenset(keys) for gloss, keys in index.items()}
+
+class SynonymIndex:
+    """Process-wide English gloss -> German lemmas index, rebuilt when its sources change"""
+
+    def __init__(self, paths=DICTIONARY_FILES, check_interval=1.0):
+        self.paths = paths
+        # Seconds between mtime checks of the dictionary files
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._index = None
+        self._file_signature = None
+        self._generation = None
+        self._checked_at = 0.0
+
+    def _read_file_signature(self):
+        signature = []
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                signature.append(None)
+            else:
+                signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def _load_pairs(self):
+        # english_german.json maps English -> German, german_english.json the other way round
+        pairs = []
+        for path in self.paths:
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            if os.path.basename(path).startswith('english'):
+                pairs.extend(entries.items())
+            else:
+                pairs.extend((english, german) for german, english in entries.items())
+        return pairs
+
+    def build(self, words, file_signature):
+        """(Re)build the index for the catalog words; needs an application context"""
+        lemmas = {}
+        pairs = []
+        for w in words:
+            for form in (w.german, w.matcher.german_answer):
+                lemmas[normalize_umlauts(form)] = normalize_answer(form)
+            # Each word's own meaning is a gloss too
+            pairs.append((w.english, w.matcher.german_answer))
+        pairs.extend(self._load_pairs())
+        self._index = build_synonym_index(pairs, lemmas)
+        self._file_signature = file_signature
+        self._generation = catalog.generation
+
+    def lemmas_by_gloss(self):
+        """{normalised English gloss: frozenset of normalised German lemmas}"""
+        words = catalog.words()
+        now = time.monotonic()
+        file_signature = self._file_signature
+        if self._index is None or now - self._checked_at >= self.check_interval:
+            file_signature = self._read_file_signature()
+            self._checked_at = now
+        if (self._index is None or file_signature != self._file_signature
+                or catalog.generation != self._generation):
+            with self._lock:
+                if (self._index is None or file_signature != self._file_signature
+                        or catalog.generation != self._generation):
+                    self.build(words, file_signature)
+        return self._index
+
+synonym_index = SynonymIndex()